@@ -1,39 +1,136 @@
-from flask import Flask
+from flask import Flask, make_response
 from flask_restful import Api
 from flask_cors import CORS
-from flask_migrate import Migrate
 from models import db
-from resources.collections import CollectionResource
-from resources.expenses import ExpenseResource
+import instrumentation
+import replica
+from commands import days_cli, rollup_cli
+from serializers import dumps
+from resources.collections import CollectionResource, CollectionBulkResource
+from resources.group_commit import DEFAULTS as GROUP_COMMIT_DEFAULTS
+from resources.expenses import ExpenseResource, ExpenseBulkResource
 from resources.reports import ReportResource
+from resources.artifact_cache import DEFAULTS as ARTIFACT_CACHE_DEFAULTS
+from resources.analytics import AnalyticsResource
+from resources.report_jobs import ReportJobsResource, ReportJobResource, ReportJobArtifactResource
+from resources.metrics import MetricsResource
+from resources.exports import ExportResource
+from resources.days import DEFAULTS as DAY_DEFAULTS, DayActionResource, DayResource
+from resources.live import DEFAULTS as LIVE_DEFAULTS, LiveReportResource
+import click
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-
-# Database configuration
-environment = os.getenv('ENVIRONMENT')
-print(f"Environment: {environment}")
-if environment == 'production':
-    database_url = os.environ.get('SUPABASE_URL')
-else:
-    database_url = os.environ.get('DATABASE_URL')
-    print(f"Development DATABASE_URL: {database_url}")
-
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db.init_app(app)
-migrate = Migrate(app, db)
-api = Api(app)
-
-# Register resources
-api.add_resource(CollectionResource, '/collections', '/collections/<string:date>', '/collections/<int:collection_id>')
-api.add_resource(ExpenseResource, '/expenses', '/expenses/<string:date>', '/expenses/<int:expense_id>')
-api.add_resource(ReportResource, '/reports/<string:type>/<string:param>')
+# Engine pool settings. These and the other modules' DEFAULTS below can be
+# overridden from the environment or create_app(config)
+POOL_DEFAULTS = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 30,
+    # Supabase and most proxies drop idle connections; recycle before they do
+    'DB_POOL_RECYCLE': 1800,
+    'DB_POOL_PRE_PING': True,
+    # Behind PgBouncer in transaction mode the bouncer does the pooling
+    'DB_PGBOUNCER': False,
+}
+
+
+def _env_value(name, default):
+    """An environment override for a config default, cast to the default's type"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return type(default)(value)
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured pool settings"""
+    url = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if url.startswith('sqlite'):
+        # SQLite uses its own per-file pools; the network pool knobs don't apply
+        return {}
+    if config['DB_PGBOUNCER']:
+        from sqlalchemy.pool import NullPool
+        # Hand every connection back to the bouncer as soon as it is released
+        return {'poolclass': NullPool}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    The Excel report stack (openpyxl) is imported by the report resources on
+    their first xlsx request, and Flask-Migrate (alembic) only when the app
+    is loaded by the flask command, so worker processes start with neither.
+    """
+    app = Flask(__name__)
+    CORS(app)
+
+    # Database configuration
+    environment = os.getenv('ENVIRONMENT')
+    if environment == 'production':
+        database_url = os.environ.get('SUPABASE_URL')
+    else:
+        database_url = os.environ.get('DATABASE_URL')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    for defaults in (POOL_DEFAULTS, replica.DEFAULTS, GROUP_COMMIT_DEFAULTS, DAY_DEFAULTS,
+                     LIVE_DEFAULTS, ARTIFACT_CACHE_DEFAULTS):
+        app.config.update({name: _env_value(name, default) for name, default in defaults.items()})
+    app.config.update(config or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    app.logger.debug('Environment: %s', environment)
+
+    replica.init_app(app)
+    db.init_app(app)
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    api = Api(app)
+    instrumentation.init_app(app)
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(days_cli)
+
+    @api.representation('application/json')
+    def output_json(data, code, headers=None):
+        """Encode JSON responses with the fast encoder"""
+        with instrumentation.timed('serialize'):
+            body = dumps(data)
+        response = make_response(body, code)
+        response.headers.extend(headers or {})
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    # Register resources
+    api.add_resource(CollectionResource, '/collections', '/collections/<string:date>', '/collections/<int:collection_id>')
+    api.add_resource(ExpenseResource, '/expenses', '/expenses/<string:date>', '/expenses/<int:expense_id>')
+    api.add_resource(CollectionBulkResource, '/collections/bulk')
+    api.add_resource(ExpenseBulkResource, '/expenses/bulk')
+    api.add_resource(ReportResource, '/reports/<string:type>/<string:param>', '/reports/<string:type>/<string:param>/<string:end>')
+    api.add_resource(AnalyticsResource, '/reports/analytics')
+    api.add_resource(LiveReportResource, '/reports/live/<string:date>')
+    api.add_resource(ReportJobsResource, '/reports/jobs')
+    api.add_resource(ReportJobResource, '/reports/jobs/<string:job_id>')
+    api.add_resource(ReportJobArtifactResource, '/reports/jobs/<string:job_id>/artifact')
+    api.add_resource(ExportResource, '/exports/<string:kind>.csv')
+    api.add_resource(DayResource, '/days/<string:date>')
+    api.add_resource(DayActionResource, '/days/<string:date>/<string:action>')
+    api.add_resource(MetricsResource, '/metrics')
+
+    return app
+
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""Measure cold-start import time and first-request latency.
+
+Each run is a fresh interpreter that imports the app module, then issues
+a first JSON request and a first xlsx report request through the test
+client. The script also records whether openpyxl and alembic were loaded
+at import time.
+
+Usage: python -m benchmarks.bench_cold_start [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+DEFAULT_RUNS = 7
+DAY = "2024-01-15"
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app as module
+application = module.app
+imported = time.perf_counter()
+heavy = {{name: name in sys.modules for name in ("openpyxl", "alembic")}}
+client = application.test_client()
+client.get("/collections/{DAY}").get_data()
+first_json = time.perf_counter()
+client.get("/reports/daily/{DAY}").get_data()
+first_xlsx = time.perf_counter()
+client.get("/reports/daily/{DAY}").get_data()
+second_xlsx = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "first_json_ms": (first_json - imported) * 1000,
+    "first_xlsx_ms": (first_xlsx - first_json) * 1000,
+    "warm_xlsx_ms": (second_xlsx - first_xlsx) * 1000,
+    **heavy,
+}}))
+"""
+
+
+def main(runs):
+    scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    # Seed from this process; every probe below starts a fresh interpreter
+    from app import app
+    from models import db
+    from benchmarks.synthetic import generate
+    with app.app_context():
+        db.create_all()
+        generate(start=date.fromisoformat(DAY).replace(day=1), days=31)
+
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", PROBE], cwd=root, check=True,
+                                capture_output=True, text=True)
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    os.unlink(scratch.name)
+
+    print(f"{runs} fresh interpreters, median ms")
+    for key in ("import_ms", "first_json_ms", "first_xlsx_ms", "warm_xlsx_ms"):
+        print(f"{key:<16} {statistics.median(sample[key] for sample in samples):>8.1f}")
+    for module in ("openpyxl", "alembic"):
+        print(f"{module + ' at import':<16} {samples[0][module]!s:>8}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS)
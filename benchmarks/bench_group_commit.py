@@ -0,0 +1,109 @@
+"""Load-test POST /collections with and without group commit.
+
+Several threads each post collections through Flask's test client as fast
+as they can, as front-desk terminals do during a rush. The run is repeated
+with GROUP_COMMIT_COLLECTIONS off and on. For each mode the script reports
+inserts per second and p50/p95/p99 latency. It then checks that every
+request got its own id and that the rollup still matches the rows.
+
+Usage: python -m benchmarks.bench_group_commit [--database-url URL]
+           [--threads N] [--requests N] [--max-rows N] [--max-wait-ms N]
+
+Without --database-url a temporary SQLite file is used. A given URL must
+point at a scratch database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.suite import summarize
+
+PAYLOAD = {
+    "card_no": "4821", "procedure": "Consultation", "doctor": "Dr. Otieno",
+    "payment_method": "CASH", "amount": "1500", "date": "2024-06-03",
+}
+
+
+def run(app, threads, total):
+    """Post total collections from threads workers; returns (elapsed, timings, ids, failures)"""
+    def worker(count):
+        client = app.test_client()
+        timings, ids, failures = [], [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.post("/collections", json=PAYLOAD)
+            timings.append(time.perf_counter() - started)
+            if response.status_code == 201:
+                ids.append(response.get_json()["id"])
+            else:
+                failures += 1
+        return timings, ids, failures
+
+    shares = [total // threads + (i < total % threads) for i in range(threads)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, shares))
+    elapsed = time.perf_counter() - started
+
+    timings = [t for result in results for t in result[0]]
+    ids = [i for result in results for i in result[1]]
+    failures = sum(result[2] for result in results)
+    return elapsed, timings, ids, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-rows", type=int, default=50)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    import logging
+    from app import app
+    from models import db, DailySummary
+
+    logging.getLogger("clinic.requests").setLevel(logging.WARNING)
+    app.config.update(GROUP_COMMIT_MAX_ROWS=args.max_rows, GROUP_COMMIT_MAX_WAIT_MS=args.max_wait_ms)
+    with app.app_context():
+        db.create_all()
+
+    status = 0
+    print(f"{args.requests} POST /collections from {args.threads} threads")
+    print(f"{'mode':<14} {'inserts/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for mode, enabled in (("per request", False), ("group commit", True)):
+        app.config["GROUP_COMMIT_COLLECTIONS"] = enabled
+        elapsed, timings, ids, failures = run(app, args.threads, args.requests)
+        stats = summarize(timings)
+        print(f"{mode:<14} {len(ids) / elapsed:>10.0f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {failures:>7}")
+        if len(set(ids)) != len(ids):
+            print(f"  FAIL {len(ids) - len(set(ids))} duplicate ids returned")
+            status = 1
+
+    with app.app_context():
+        drift = DailySummary.verify()
+    if drift:
+        print(f"FAIL rollup drift: {drift[:5]}")
+        status = 1
+    else:
+        print("Rollup matches the inserted rows")
+
+    if scratch is not None:
+        os.unlink(scratch.name)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Compare the in-memory and write-only DailyReportBuilder modes.
+
+Usage: python -m benchmarks.bench_report_builder [rows ...]
+"""
+import sys
+import time
+import tracemalloc
+
+from resources.report_builder import DailyReportBuilder
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+PAYMENT_METHODS = ("CASH", "MPESA", "TILL", "INVOICE", "CARD")
+
+
+def synthetic_day(rows):
+    """Day data shaped like Expense.get_day_tallies output"""
+    collections = [
+        {
+            "card_no": str(1000 + i),
+            "procedure": "Scaling and polishing",
+            "payment_method": PAYMENT_METHODS[i % len(PAYMENT_METHODS)],
+            "invoice_source": None,
+            "amount": float(500 + i % 50 * 100),
+            "doctor": "Dr. Otieno",
+        }
+        for i in range(rows)
+    ]
+    expenses = [
+        {"expense_name": "Supplies", "payment_method": "CASH", "amount": 250.0}
+        for _ in range(max(1, rows // 20))
+    ]
+    totals = dict.fromkeys((
+        "cash_total", "mpesa_total", "till_total", "invoice_total", "card_total",
+        "mobile_money_total", "gross_collections", "total_expenses", "net_total",
+        "cash_in_hand",
+    ), 0.0)
+    return {"date": "2024-01-01", "collections": collections, "expenses": expenses, "totals": totals}
+
+
+def render_in_memory(day_data):
+    return len(DailyReportBuilder("2024-01-01", day_data).build().getvalue())
+
+
+def render_streaming(day_data):
+    return sum(len(chunk) for chunk in DailyReportBuilder("2024-01-01", day_data, write_only=True).stream())
+
+
+def measure(render, day_data):
+    start = time.perf_counter()
+    size = render(day_data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(day_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'mode':<10} {'seconds':>8} {'peak MiB':>9} {'bytes':>10}")
+    for rows in sizes:
+        day_data = synthetic_day(rows)
+        for mode, render in (("in-memory", render_in_memory), ("streaming", render_streaming)):
+            elapsed, peak, size = measure(render, day_data)
+            print(f"{rows:>8} {mode:<10} {elapsed:>8.2f} {peak / 2**20:>9.1f} {size:>10}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
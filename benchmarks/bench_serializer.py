@@ -0,0 +1,76 @@
+"""Compare SerializerMixin.to_dict() with the precompiled ModelSerializer.
+
+Usage: python -m benchmarks.bench_serializer [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DEFAULT_ROWS = 10_000
+REPEATS = 5
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(rows):
+    scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    from sqlalchemy import select
+    from app import app
+    from models import db, Collection, PaymentMethod
+    from serializers import dumps, serializer_for
+    import json
+
+    methods = list(PaymentMethod)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            Collection(card_no=str(i), procedure="Consultation", doctor="Dr. A",
+                       payment_method=methods[i % len(methods)], amount=500.0,
+                       date=date(2024, 1, 1) + timedelta(days=i % 30))
+            for i in range(rows)
+        )
+        db.session.commit()
+        serializer = serializer_for(Collection)
+
+        def orm_to_dict():
+            db.session.expunge_all()
+            return [c.to_dict() for c in Collection.query.all()]
+
+        def orm_compiled():
+            db.session.expunge_all()
+            return [serializer.to_dict(c) for c in Collection.query.all()]
+
+        def core_compiled():
+            return serializer.many(db.session.execute(select(*serializer.columns)))
+
+        baseline_time, baseline = best_of(orm_to_dict)
+        print(f"{rows} rows, best of {REPEATS}")
+        print(f"{'path':<36} {'seconds':>8} {'speedup':>8}")
+        print(f"{'ORM + to_dict()':<36} {baseline_time:>8.3f} {1:>8.1f}")
+        for label, func in (("ORM + ModelSerializer.to_dict", orm_compiled),
+                            ("Core select + row_to_dict", core_compiled)):
+            elapsed, result = best_of(func)
+            assert result == baseline, f"{label} output differs from to_dict()"
+            print(f"{label:<36} {elapsed:>8.3f} {baseline_time / elapsed:>8.1f}")
+
+        json_time, _ = best_of(lambda: json.dumps(baseline))
+        fast_time, _ = best_of(lambda: dumps(baseline))
+        print(f"{'json.dumps':<36} {json_time:>8.3f}")
+        print(f"{'serializers.dumps':<36} {fast_time:>8.3f}")
+
+    os.unlink(scratch.name)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,126 @@
+"""Check the NumPy tally engine against the SQL one and compare their speed.
+
+Seeds a scratch database with benchmarks.synthetic. The script fails if
+columnar.compute_from_base differs from DailySummary.compute_from_base, or
+if columnar.day_totals differs from DailySummary.totals_for on the rebuilt
+rollup, by even one value. It then times both engines, and the per-row
+Python sums the reports used before the rollup, over the whole seeded range.
+
+Usage: python -m benchmarks.bench_tally_engine [--months N] [--rows-per-day N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+REPEATS = 3
+SEED_START = date(2024, 1, 1)
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def python_sums(start_date, end_date):
+    """Per-day totals the way the reports computed them before the rollup:
+    load every row and sum per payment method in Python"""
+    from models import Collection, Expense, PaymentMethod
+
+    collections, expenses = {}, {}
+    for c in Collection.query.filter(Collection.date.between(start_date, end_date)):
+        collections.setdefault(c.date, []).append(c)
+    for e in Expense.query.filter(Expense.date.between(start_date, end_date)):
+        expenses.setdefault(e.date, []).append(e)
+    totals = {}
+    for day in set(collections) | set(expenses):
+        rows = collections.get(day, [])
+        method_totals = {
+            method: sum(c.amount for c in rows if c.payment_method == method)
+            for method in PaymentMethod
+        }
+        totals[day] = Expense.compute_totals(method_totals, sum(e.amount for e in expenses.get(day, [])))
+    return totals
+
+
+def parity(start_date, end_date):
+    """Mismatches between the engines for a range, as printable strings"""
+    import columnar
+    from models import DailySummary
+
+    problems = []
+    sql = DailySummary.compute_from_base(start_date, end_date)
+    numpy = columnar.compute_from_base(start_date, end_date)
+    for day in sorted(set(sql) | set(numpy)):
+        if sql.get(day) != numpy.get(day):
+            problems.append(f"compute_from_base {day}: sql={sql.get(day)} numpy={numpy.get(day)}")
+
+    query = DailySummary.query
+    if start_date:
+        query = query.filter(DailySummary.date >= start_date)
+    if end_date:
+        query = query.filter(DailySummary.date <= end_date)
+    rollup = {s.date: DailySummary.totals_for(s) for s in query
+              if s.collections_count or s.expenses_count}
+    vectorized = columnar.day_totals(start_date, end_date)
+    for day in sorted(set(rollup) | set(vectorized)):
+        if rollup.get(day) != vectorized.get(day):
+            problems.append(f"day_totals {day}: rollup={rollup.get(day)} numpy={vectorized.get(day)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--rows-per-day", type=int, default=200)
+    args = parser.parse_args()
+
+    scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    from app import app
+    from models import db, DailySummary
+    from benchmarks.synthetic import generate
+    import columnar
+
+    if not columnar.available():
+        print("NumPy is not installed")
+        return 1
+
+    with app.app_context():
+        db.create_all()
+        first, last, collections, _ = generate(
+            start=SEED_START, months=args.months, rows_per_day=args.rows_per_day
+        )
+        print(f"{collections} collections from {first} to {last}")
+
+        problems = []
+        for start_date, end_date in ((None, None), (first, last), (date(first.year, 2, 10), date(first.year, 3, 20))):
+            problems.extend(parity(start_date, end_date))
+        for problem in problems[:20]:
+            print(f"MISMATCH {problem}")
+        print("parity: " + (f"{len(problems)} mismatches" if problems else "identical"))
+
+        print(f"{'engine':<34} {'seconds':>8} {'speedup':>8}")
+        baseline, _ = best_of(lambda: python_sums(first, last))
+        print(f"{'ORM rows + Python sums':<34} {baseline:>8.3f} {1:>8.1f}")
+        for label, func in (
+            ("SQL compute_from_base", lambda: DailySummary.compute_from_base(first, last)),
+            ("NumPy compute_from_base", lambda: columnar.compute_from_base(first, last)),
+            ("NumPy day_totals", lambda: columnar.day_totals(first, last)),
+        ):
+            elapsed, _ = best_of(func)
+            print(f"{label:<34} {elapsed:>8.3f} {baseline / elapsed:>8.1f}")
+
+    os.unlink(scratch.name)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Fail if the date-keyed hot queries fall back to full table scans.
+
+Seeds a scratch database, drives the day/month report and listing endpoints
+through Flask's test client, captures every SELECT they run and EXPLAINs it.
+
+Usage: python -m benchmarks.check_query_plans [--database-url URL]
+tests/test_query_plans.py runs the same check under pytest.
+
+Without --database-url a temporary SQLite file is used. A given URL must
+point at a scratch database: tables are created and seeded if empty.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+# Requests exercised against the seeded data
+CHECKED_REQUESTS = (
+    ("day report", "/reports/day/2024-03-15"),
+    ("day totals", "/reports/day/2024-03-15?totals_only=1"),
+    ("monthly report", "/reports/monthly/2024-03"),
+    ("collections by date", "/collections/2024-03-15"),
+    ("expenses by date", "/expenses/2024-03-15"),
+    ("collections page", "/collections?limit=50"),
+    ("collections next page", "/collections?limit=50&after=2024-03-15:1"),
+    ("expenses range page", "/expenses?start=2024-03-01&end=2024-03-31&limit=50"),
+    ("range report", "/reports/range/2024-01-01/2024-03-31?bucket=week"),
+    ("balance", "/reports/balance/2024-03-15"),
+    ("balance between dates", "/reports/balance/2024-02-01/2024-03-31"),
+    ("doctor analytics", "/reports/analytics?start=2024-03-01&end=2024-03-31&group_by=both"),
+    ("collections export", "/exports/collections.csv?start=2024-03-01&end=2024-03-31&payment_method=CASH,MPESA"),
+    ("expenses export", "/exports/expenses.csv?start=2024-03-01&end=2024-03-31"),
+)
+
+SEED_DAYS = 120
+SEED_COLLECTIONS_PER_DAY = 40
+SEED_EXPENSES_PER_DAY = 5
+
+
+def seed(db):
+    from models import Collection
+    from benchmarks.synthetic import generate
+
+    if db.session.query(Collection.id).first() is not None:
+        return
+    generate(start=date(2024, 1, 1), days=SEED_DAYS, rows_per_day=SEED_COLLECTIONS_PER_DAY,
+             expenses_per_day=SEED_EXPENSES_PER_DAY)
+
+
+def explain(connection, statement, parameters):
+    """Return the plan lines for a statement"""
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.name == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN " + statement, parameters)
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def full_scans(dialect, plan):
+    """Plan lines that read a whole table instead of an index"""
+    if dialect == "sqlite":
+        # "SCAN collections USING INDEX ..." is an ordered index walk; a bare
+        # "SCAN collections" reads the table
+        return [line for line in plan if line.startswith("SCAN ") and "USING" not in line]
+    return [line for line in plan if "Seq Scan" in line]
+
+
+def check(app):
+    """EXPLAIN every SELECT the checked requests issue against app's database.
+
+    Creates and seeds the tables if needed. Returns (label, target, status,
+    plans): status is the request's HTTP status, and plans holds a
+    (statement, plan lines, full scan lines) entry per captured SELECT.
+    """
+    from sqlalchemy import event
+    from models import db, DailySummary
+
+    results = []
+    with app.app_context():
+        db.create_all()
+        seed(db)
+        engine = db.engine
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        client = app.test_client()
+        checks = [(label, url, lambda url=url: client.get(url).status_code)
+                  for label, url in CHECKED_REQUESTS]
+        # The rollup's grouped SUM(CASE ...) queries over one month
+        checks.append(("rollup recompute", "DailySummary.compute_from_base", lambda: (
+            DailySummary.compute_from_base(date(2024, 3, 1), date(2024, 3, 31)) and 200
+        )))
+
+        with engine.connect() as connection:
+            if engine.dialect.name == "postgresql":
+                # Small seeded tables make sequential scans look cheap
+                connection.exec_driver_sql("SET enable_seqscan = off")
+
+            for label, target, run in checks:
+                captured.clear()
+                event.listen(engine, "before_cursor_execute", capture)
+                try:
+                    status_code = run()
+                finally:
+                    event.remove(engine, "before_cursor_execute", capture)
+                plans = []
+                if status_code == 200:
+                    for statement, parameters in captured:
+                        plan = explain(connection, statement, parameters)
+                        plans.append((statement, plan, full_scans(engine.dialect.name, plan)))
+                results.append((label, target, status_code, plans))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    from app import app
+
+    failures = 0
+    for label, target, status_code, plans in check(app):
+        if status_code != 200:
+            print(f"FAIL {label}: {target} returned {status_code}")
+            failures += 1
+            continue
+        for statement, plan, scans in plans:
+            status = "FAIL" if scans else "ok"
+            print(f"{status:<4} {label}: {' '.join(statement.split())[:100]}")
+            for line in plan:
+                print(f"       {line}")
+            failures += bool(scans)
+
+    if scratch is not None:
+        os.unlink(scratch.name)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
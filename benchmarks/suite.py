@@ -0,0 +1,335 @@
+"""Time the report and listing endpoints and the workbook builders.
+
+Seeds a scratch database with benchmarks.synthetic, then for each scenario
+reports p50/p95/p99 latency, SQL statements per call and peak traced
+memory. Report files that the artifact cache serves are timed twice: cold,
+with the cache emptied before each call, and warm. --concurrency adds a load run that drives the endpoint scenarios
+from several threads at once. Results can be saved as a baseline and a
+later run compared against it.
+
+Usage: python -m benchmarks.suite [--database-url URL] [--months N]
+           [--rows-per-day N] [--iterations N] [--concurrency N]
+           [--requests N] [--only NAME ...] [--save PATH]
+           [--compare PATH] [--tolerance FRACTION]
+
+Without --database-url a temporary SQLite file is used. A given URL must
+point at a scratch database: tables are created and seeded if empty.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+SEED_START = date(2024, 1, 1)
+
+# Endpoint scenarios; {day}, {month}, {start} and {end} come from the seeded range
+ENDPOINTS = (
+    ("day report", "/reports/day/{day}"),
+    ("day totals", "/reports/day/{day}?totals_only=1"),
+    ("daily xlsx", "/reports/daily/{day}"),
+    ("daily xlsx streamed", "/reports/daily/{day}?stream=1"),
+    ("monthly report", "/reports/monthly/{month}"),
+    ("monthly totals", "/reports/monthly/{month}?totals_only=1"),
+    ("monthly xlsx", "/reports/monthly-xlsx/{month}"),
+    ("range by week", "/reports/range/{start}/{end}?bucket=week"),
+    ("doctor analytics", "/reports/analytics?start={start}&end={end}&group_by=both"),
+    ("collections by date", "/collections/{day}"),
+    ("collections page", "/collections?limit=100"),
+    ("collections range page", "/collections?start={start}&end={end}&limit=500"),
+    ("expenses range page", "/expenses?start={start}&end={end}&limit=500"),
+    ("collections ndjson", "/collections?start={month_start}&end={month_end}&stream=ndjson"),
+    ("collections csv export", "/exports/collections.csv?start={start}&end={end}"),
+)
+# Endpoints served from the artifact cache once rendered. "<name>" empties the
+# cache before every call so it keeps timing the rendering; "<name> cached"
+# times the hits
+CACHED_ENDPOINTS = ("daily xlsx", "daily xlsx streamed", "monthly xlsx")
+
+
+def builder_scenarios(day, month_start, month_end):
+    """Scenarios that call the tallies and workbook builders directly"""
+    from models import Expense
+    from resources.report_builder import DailyReportBuilder, MultiDayReportBuilder
+
+    day_data = Expense.get_day_tallies(day)
+
+    def month_days():
+        current = month_start
+        while current <= month_end:
+            yield Expense.get_day_tallies(current)
+            current += timedelta(days=1)
+
+    return (
+        ("get_day_tallies", lambda: Expense.get_day_tallies(day)),
+        ("get_month_tallies", lambda: Expense.get_month_tallies(month_start.month, month_start.year)),
+        ("DailyReportBuilder.build",
+         lambda: DailyReportBuilder(day.isoformat(), day_data).build().getvalue()),
+        ("DailyReportBuilder.stream",
+         lambda: sum(map(len, DailyReportBuilder(day.isoformat(), day_data, write_only=True).stream()))),
+        ("MultiDayReportBuilder.stream", lambda: sum(map(len, MultiDayReportBuilder(month_days()).stream()))),
+    )
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "calls": len(timings),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+    }
+
+
+class QueryCounter:
+    """Count the SQL statements an engine runs, per thread"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.local = threading.local()
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.local.count = getattr(self.local, "count", 0) + 1
+
+    def take(self):
+        count, self.local.count = getattr(self.local, "count", 0), 0
+        return count
+
+
+def get(client, url):
+    """Issue a GET and read the whole body, failing on anything but 200"""
+    response = client.get(url)
+    body = response.get_data()
+    response.close()
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} returned {response.status_code}: {body[:200]!r}")
+    return body
+
+
+def uncached(client, url):
+    """get() with the artifact cache emptied first, so the file is rendered"""
+    from resources.artifact_cache import artifacts
+    artifacts.clear()
+    return get(client, url)
+
+
+def endpoint_scenarios(client, values):
+    scenarios = []
+    for name, url in ENDPOINTS:
+        url = url.format(**values)
+        if name in CACHED_ENDPOINTS:
+            scenarios.append((name, lambda url=url: uncached(client, url)))
+            scenarios.append((f"{name} cached", lambda url=url: get(client, url)))
+        else:
+            scenarios.append((name, lambda url=url: get(client, url)))
+    return scenarios
+
+
+def measure(run, iterations, counter):
+    """Latencies, statements per call and traced peak memory for one scenario"""
+    run()  # warm caches, compiled statements and lazy imports
+    counter.take()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    queries = counter.take() / iterations
+
+    # tracemalloc slows allocation down, so memory gets its own call
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    counter.take()
+
+    result = summarize(timings)
+    result["queries"] = round(queries, 2)
+    result["peak_kib"] = round(peak / 1024, 1)
+    return result
+
+
+def load(app, urls, concurrency, total, counter):
+    """Drive the endpoint URLs from concurrency threads, total requests in all"""
+    timings = []
+    errors = []
+
+    def worker(share):
+        client = app.test_client()
+        local_timings = []
+        for i in range(share):
+            url = urls[i % len(urls)]
+            started = time.perf_counter()
+            try:
+                get(client, url)
+            except Exception as exc:
+                errors.append(str(exc))
+                continue
+            local_timings.append(time.perf_counter() - started)
+        timings.extend(local_timings)
+        return counter.take()
+
+    shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        queries = sum(pool.map(worker, shares))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(timings) if timings else {"calls": 0}
+    result.update({
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "queries": round(queries / max(1, total), 2),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+    })
+    for message in errors[:5]:
+        print(f"  error: {message}")
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against a saved baseline; return the regressed scenario names"""
+    regressions = []
+    print(f"\n{'scenario':<30} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'queries':>9}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or "p95_ms" not in current or not previous.get("p95_ms"):
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        queries = f"{previous['queries']:g}->{current['queries']:g}"
+        slower = change > tolerance
+        more_queries = current["queries"] > previous["queries"]
+        flag = "  REGRESSED" if slower or more_queries else ""
+        print(f"{name:<30} {previous['p95_ms']:>9.2f} {current['p95_ms']:>9.2f} "
+              f"{change:>+8.0%} {queries:>9}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def print_row(name, result):
+    print(f"{name:<30} {result.get('p50_ms', 0):>8.2f} {result.get('p95_ms', 0):>8.2f} "
+          f"{result.get('p99_ms', 0):>8.2f} {result['queries']:>7g} "
+          f"{result.get('peak_kib', 0) / 1024:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--rows-per-day", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="threads for the load run; 0 skips it")
+    parser.add_argument("--requests", type=int, default=400, help="requests in the load run")
+    parser.add_argument("--only", nargs="*", help="run only scenarios whose name contains one of these")
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p95 slowdown before a scenario counts as regressed")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    from app import app
+    from models import db, Collection
+    from benchmarks.synthetic import generate, months_after
+
+    # One log line per request would drown the results
+    logging.getLogger("clinic.requests").setLevel(logging.WARNING)
+
+    results = {}
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Collection.id).first() is None:
+            generate(start=SEED_START, months=args.months, rows_per_day=args.rows_per_day)
+        end = months_after(SEED_START, args.months)
+        # A day two weeks before the end of the seeded range, its month and
+        # the last 90 days
+        day = end - timedelta(days=14)
+        month_start = day.replace(day=1)
+        month_end = months_after(month_start, 1)
+        start = max(SEED_START, end - timedelta(days=89))
+        values = {
+            "day": day.isoformat(), "month": f"{day.year}-{day.month:02d}",
+            "start": start.isoformat(), "end": end.isoformat(),
+            "month_start": month_start.isoformat(), "month_end": month_end.isoformat(),
+        }
+
+        client = app.test_client()
+        scenarios = endpoint_scenarios(client, values)
+        scenarios.extend(builder_scenarios(day, month_start, month_end))
+        if args.only:
+            scenarios = [(name, run) for name, run in scenarios
+                         if any(word in name for word in args.only)]
+
+        print(f"{'scenario':<30} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7} {'peak MiB':>9}")
+        with QueryCounter(db.engine) as counter:
+            for name, run in scenarios:
+                results[name] = measure(run, args.iterations, counter)
+                print_row(name, results[name])
+
+            if args.concurrency:
+                urls = [url.format(**values) for name, url in ENDPOINTS
+                        if not args.only or any(word in name for word in args.only)]
+                name = f"load x{args.concurrency}"
+                results[name] = load(app, urls, args.concurrency, args.requests, counter)
+                print_row(name, results[name])
+                print(f"{'':<30} {results[name]['requests_per_second']} req/s, "
+                      f"{results[name]['errors']} errors")
+
+    if scratch is not None:
+        os.unlink(scratch.name)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.tolerance):
+            status = 1
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+                "settings": {"months": args.months, "rows_per_day": args.rows_per_day,
+                             "iterations": args.iterations},
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Seed a database with synthetic clinic collections and expenses.
+
+Usage: python -m benchmarks.synthetic [--database-url URL] [--start YYYY-MM-DD]
+           [--months N] [--rows-per-day N] [--expenses-per-day N]
+           [--mix CASH=35,MPESA=30,TILL=15,INVOICE=10,CARD=10] [--seed N]
+
+Without --database-url the app's configured DATABASE_URL is used. Rows are
+appended; the rollup is rebuilt for the seeded range afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+# Default share of visits per payment method
+DEFAULT_MIX = {"CASH": 35, "MPESA": 30, "TILL": 15, "INVOICE": 10, "CARD": 10}
+
+DOCTORS = ("Dr. Otieno", "Dr. Wanjiku", "Dr. Mwangi", "Dr. Achieng", "Dr. Kamau")
+# Procedure name and its price range
+PROCEDURES = (
+    ("Consultation", 500, 1500),
+    ("Scaling and polishing", 2500, 4500),
+    ("Extraction", 1500, 5000),
+    ("Filling", 3000, 8000),
+    ("Root canal", 12000, 25000),
+    ("X-ray", 800, 2000),
+    ("Crown", 20000, 45000),
+)
+INVOICE_SOURCES = ("NHIF", "AAR", "Jubilee", "Britam", "CIC")
+EXPENSES = (
+    ("Supplies", 500, 6000),
+    ("Lab fees", 1500, 12000),
+    ("Transport", 200, 1500),
+    ("Utilities", 1000, 8000),
+    ("Staff lunch", 300, 2000),
+)
+
+BATCH_SIZE = 5000
+
+
+def parse_mix(value):
+    """Parse "CASH=40,MPESA=60" into a weight per payment method"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().upper()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown payment method {name!r}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise ValueError("Payment method mix must have a positive weight")
+    return mix
+
+
+def months_after(start, months):
+    """The last day of the months-th month counted from start's month"""
+    month_index = start.month - 1 + months - 1
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, monthrange(year, month)[1])
+
+
+def collection_rows(rng, day, count, mix):
+    from models import PaymentMethod
+
+    methods = [PaymentMethod[name] for name in mix]
+    picks = rng.choices(methods, weights=list(mix.values()), k=count)
+    for method in picks:
+        procedure, low, high = rng.choice(PROCEDURES)
+        yield {
+            "card_no": str(rng.randint(1000, 99999)),
+            "procedure": procedure,
+            "payment_method": method,
+            "invoice_source": rng.choice(INVOICE_SOURCES) if method is PaymentMethod.INVOICE else None,
+            "amount": float(rng.randrange(low, high + 1, 50)),
+            "doctor": rng.choice(DOCTORS),
+            "date": day,
+        }
+
+
+def expense_rows(rng, day, count):
+    from models import ExpensePaymentMethod
+
+    for _ in range(count):
+        name, low, high = rng.choice(EXPENSES)
+        yield {
+            "expense_name": name,
+            "amount": float(rng.randrange(low, high + 1, 50)),
+            "payment_method": rng.choice((ExpensePaymentMethod.CASH, ExpensePaymentMethod.MPESA)),
+            "date": day,
+        }
+
+
+def _flush(model, rows):
+    from sqlalchemy import insert
+    from models import db
+
+    if rows:
+        db.session.execute(insert(model), rows)
+        rows.clear()
+
+
+def generate(start=date(2024, 1, 1), days=None, months=3, rows_per_day=40,
+             expenses_per_day=5, mix=None, seed=0, jitter=0.25):
+    """Insert synthetic rows for each day in the range and rebuild its rollup.
+
+    Must run inside an app context. Daily row counts vary by +/- jitter
+    around rows_per_day so the days are not all the same size. Returns
+    (first_day, last_day, collections, expenses).
+    """
+    from models import db, Collection, Expense, DailySummary
+
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    end = start + timedelta(days=days - 1) if days else months_after(start, months)
+
+    collections, expenses = [], []
+    collection_count = expense_count = 0
+    day = start
+    while day <= end:
+        spread = int(rows_per_day * jitter)
+        count = max(0, rows_per_day + rng.randint(-spread, spread))
+        collections.extend(collection_rows(rng, day, count, mix))
+        expenses.extend(expense_rows(rng, day, expenses_per_day))
+        collection_count += count
+        expense_count += expenses_per_day
+        if len(collections) >= BATCH_SIZE:
+            _flush(Collection, collections)
+        if len(expenses) >= BATCH_SIZE:
+            _flush(Expense, expenses)
+        day += timedelta(days=1)
+    _flush(Collection, collections)
+    _flush(Expense, expenses)
+    db.session.commit()
+
+    DailySummary.rebuild(start, end)
+    return start, end, collection_count, expense_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2024, 1, 1))
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--rows-per-day", type=int, default=40)
+    parser.add_argument("--expenses-per-day", type=int, default=5)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        first, last, collections, expenses = generate(
+            start=args.start, months=args.months, rows_per_day=args.rows_per_day,
+            expenses_per_day=args.expenses_per_day, mix=args.mix, seed=args.seed,
+        )
+        elapsed = time.perf_counter() - started
+    print(f"Seeded {collections} collections and {expenses} expenses "
+          f"from {first} to {last} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Columnar tally engine for long date ranges.
+
+Recomputing totals from the base tables over many months spends most of its
+time building and summing Python rows. This engine fetches each table once
+as flat columns of numbers (day number, payment method code, amount) and
+does the per-day, per-method sums with np.bincount. The report totals
+(mobile money, gross, net, cash in hand) are then derived for every day at
+once.
+
+Its output is identical to DailySummary.compute_from_base and
+DailySummary.totals_for: the sums are rounded to cents the same way, and
+the totals use the same arithmetic in the same order. NumPy is optional;
+available() reports whether the engine can be used, and the engine raises
+RuntimeError when it is called without it.
+"""
+from datetime import date, timedelta
+from itertools import chain
+
+from sqlalchemy import case, func, literal, select
+
+from models import db, Collection, Expense, DailySummary, PaymentMethod
+
+try:
+    import numpy as np
+except ImportError:  # optional, DailySummary.compute_from_base covers everything
+    np = None
+
+# Day numbers are counted from this date
+EPOCH = date(1970, 1, 1)
+METHODS = tuple(DailySummary.METHOD_COLUMNS)
+
+
+def available():
+    """Whether NumPy is installed"""
+    return np is not None
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("The numpy tally engine needs NumPy. Install it or use --engine sql")
+
+
+def _day_number(column):
+    """SQL expression for a date column as whole days since EPOCH, or None
+    when the dialect has no cheap way to compute it"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return func.julianday(column) - func.julianday(literal(EPOCH.isoformat()))
+    if dialect == "postgresql":
+        return column - literal(EPOCH)
+    return None
+
+
+def _columns(model, *columns, start_date=None, end_date=None):
+    """Fetch (day number, *columns) for a table's rows in the range as a 2-D float array"""
+    day = _day_number(model.date)
+    query = select(model.date if day is None else day, *columns)
+    if start_date:
+        query = query.where(model.date >= start_date)
+    if end_date:
+        query = query.where(model.date <= end_date)
+
+    # A Core execute on the session's connection skips ORM result processing
+    rows = db.session.connection().execute(query)
+    if day is None:
+        rows = ((d.toordinal() - EPOCH.toordinal(), *rest) for d, *rest in rows)
+    width = len(columns) + 1
+    values = np.fromiter(chain.from_iterable(rows), dtype=np.float64)
+    return values.reshape(-1, width)
+
+
+def tally_arrays(start_date=None, end_date=None):
+    """Per-day sums and counts as arrays.
+
+    Returns (first_day, method_sums, collection_counts, expense_sums,
+    expense_counts). Row i of each array is first_day + i days, and
+    method_sums has one column per payment method in METHODS order. Nothing
+    is rounded yet. Returns None when neither table has rows in the range.
+    """
+    _require_numpy()
+    method_code = case(
+        *((Collection.payment_method == method, index) for index, method in enumerate(METHODS))
+    )
+    collections = _columns(
+        Collection, method_code, func.coalesce(Collection.amount, 0),
+        start_date=start_date, end_date=end_date,
+    )
+    expenses = _columns(
+        Expense, func.coalesce(Expense.amount, 0),
+        start_date=start_date, end_date=end_date,
+    )
+    if not len(collections) and not len(expenses):
+        return None
+
+    collection_days = collections[:, 0].astype(np.int64)
+    expense_days = expenses[:, 0].astype(np.int64)
+    first = min(day.min() for day in (collection_days, expense_days) if len(day))
+    last = max(day.max() for day in (collection_days, expense_days) if len(day))
+    days = int(last - first + 1)
+    collection_days -= first
+    expense_days -= first
+
+    # One flat bincount over (day, method) cells, then back to a days x methods grid
+    cells = collection_days * len(METHODS) + collections[:, 1].astype(np.int64)
+    method_sums = np.bincount(
+        cells, weights=collections[:, 2], minlength=days * len(METHODS)
+    ).reshape(days, len(METHODS))
+    collection_counts = np.bincount(collection_days, minlength=days)
+    expense_sums = np.bincount(expense_days, weights=expenses[:, 1], minlength=days)
+    expense_counts = np.bincount(expense_days, minlength=days)
+
+    first_day = EPOCH + timedelta(days=int(first))
+    return first_day, method_sums, collection_counts, expense_sums, expense_counts
+
+
+def compute_from_base(start_date=None, end_date=None):
+    """Drop-in replacement for DailySummary.compute_from_base"""
+    arrays = tally_arrays(start_date, end_date)
+    if arrays is None:
+        return {}
+    first_day, method_sums, collection_counts, expense_sums, expense_counts = arrays
+
+    method_sums = np.round(method_sums, 2)
+    expense_sums = np.round(expense_sums, 2)
+    columns = list(DailySummary.METHOD_COLUMNS.values())
+    rollup = {}
+    for offset in np.flatnonzero(collection_counts + expense_counts).tolist():
+        values = dict(zip(columns, method_sums[offset].tolist()))
+        values['expenses_total'] = expense_sums[offset].item()
+        values['collections_count'] = int(collection_counts[offset])
+        values['expenses_count'] = int(expense_counts[offset])
+        rollup[first_day + timedelta(days=offset)] = values
+    return rollup
+
+
+def day_totals(start_date=None, end_date=None):
+    """Report totals for every day with collections or expenses, keyed by date.
+
+    Same values as DailySummary.totals_for on an up-to-date rollup row, but
+    computed from the base tables and vectorized across the whole range.
+    """
+    arrays = tally_arrays(start_date, end_date)
+    if arrays is None:
+        return {}
+    first_day, method_sums, collection_counts, expense_sums, expense_counts = arrays
+
+    method_sums = np.round(method_sums, 2)
+    total_expenses = np.round(expense_sums, 2)
+    by_method = {method: method_sums[:, index] for index, method in enumerate(METHODS)}
+    cash, mpesa, till, invoice, card = (by_method[method] for method in (
+        PaymentMethod.CASH, PaymentMethod.MPESA, PaymentMethod.TILL,
+        PaymentMethod.INVOICE, PaymentMethod.CARD,
+    ))
+    # Same operations in the same order as Expense.compute_totals
+    mobile_money = till * 0.9945 + mpesa
+    gross = cash + mobile_money + invoice + card
+    net = gross - total_expenses
+    cash_in_hand = (mobile_money + cash) - total_expenses
+
+    keys = ('cash_total', 'mpesa_total', 'till_total', 'invoice_total', 'card_total',
+            'mobile_money_total', 'gross_collections', 'total_expenses', 'net_total',
+            'cash_in_hand')
+    columns = [array.tolist() for array in (cash, mpesa, till, invoice, card, mobile_money,
+                                            gross, total_expenses, net, cash_in_hand)]
+    totals = {}
+    for offset in np.flatnonzero(collection_counts + expense_counts).tolist():
+        totals[first_day + timedelta(days=offset)] = {
+            key: column[offset] for key, column in zip(keys, columns)
+        }
+    return totals
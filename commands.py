@@ -0,0 +1,86 @@
+import click
+from flask.cli import AppGroup
+from datetime import date, datetime, timedelta
+from models import db, DailyBalance, DailySummary, DaySnapshot
+
+rollup_cli = AppGroup('rollup', help='Maintain the daily_summaries rollup table.')
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+engine_option = click.option(
+    '--engine', type=click.Choice(DailySummary.ENGINES), default='sql', show_default=True,
+    help='Recompute with grouped SQL or the NumPy columnar engine',
+)
+
+
+def _recompute(method, *args, **kwargs):
+    """Run a rollup recompute, reporting a missing NumPy as a CLI error"""
+    try:
+        return method(*args, **kwargs)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))
+
+
+@rollup_cli.command('rebuild')
+@click.option('--start', help='First date to rebuild (YYYY-MM-DD)')
+@click.option('--end', help='Last date to rebuild (YYYY-MM-DD)')
+@engine_option
+def rebuild_rollup(start, end, engine):
+    """Recompute the rollup, and the running totals from --start on, from the base tables"""
+    days = _recompute(DailySummary.rebuild, _parse_date(start), _parse_date(end), engine=engine)
+    click.echo(f"Rebuilt {days} daily summaries")
+
+
+@rollup_cli.command('verify')
+@click.option('--start', help='First date to check (YYYY-MM-DD)')
+@click.option('--end', help='Last date to check (YYYY-MM-DD)')
+@engine_option
+def verify_rollup(start, end, engine):
+    """Report any drift between the rollup and the base tables"""
+    drift = _recompute(DailySummary.verify, _parse_date(start), _parse_date(end), engine=engine)
+    for day, column, stored, expected in drift:
+        click.echo(f"{day.isoformat()} {column}: stored={stored} expected={expected}")
+    balance_drift = DailyBalance.verify()
+    for day, column, stored, expected in balance_drift:
+        click.echo(f"{day.isoformat()} running {column}: stored={stored} expected={expected}")
+    if drift or balance_drift:
+        raise click.ClickException(
+            f"{len(drift) + len(balance_drift)} drifted values; run 'flask rollup rebuild'"
+        )
+    click.echo("Rollup matches base tables")
+
+
+days_cli = AppGroup('days', help='Close and reopen days.')
+
+
+@days_cli.command('close')
+@click.option('--start', help='First date to close (YYYY-MM-DD); defaults to --end')
+@click.option('--end', help='Last date to close (YYYY-MM-DD); defaults to yesterday')
+@click.option('--xlsx', is_flag=True, help='Also store the rendered daily report')
+@click.option('--actor', help='Recorded in the audit entries')
+def close_days(start, end, xlsx, actor):
+    """Snapshot and close every day in the range that is still open"""
+    end_date = _parse_date(end) or date.today() - timedelta(days=1)
+    start_date = _parse_date(start) or end_date
+    day, closed = start_date, 0
+    while day <= end_date:
+        summary = db.session.get(DailySummary, day)
+        if summary is None or summary.closed_at is None:
+            DaySnapshot.close(day, include_xlsx=xlsx, actor=actor)
+            closed += 1
+        day += timedelta(days=1)
+    click.echo(f"Closed {closed} days")
+
+
+@days_cli.command('reopen')
+@click.argument('day')
+@click.option('--reason', required=True, help='Recorded in the audit entry')
+@click.option('--actor', help='Recorded in the audit entry')
+def reopen_day(day, reason, actor):
+    """Reopen a closed day and drop its snapshot"""
+    if not DaySnapshot.reopen(_parse_date(day), reason=reason, actor=actor):
+        raise click.ClickException(f"{day} is not closed")
+    click.echo(f"Reopened {day}")
@@ -0,0 +1,244 @@
+"""Per-request performance instrumentation.
+
+Every request gets a RequestStats on flask.g. SQLAlchemy engine events add
+each statement's count and time to it. Code that serializes rows or renders
+workbooks wraps that work in timed('serialize') / timed('render'). Phases
+are exclusive: a phase's time excludes the statements and the other phases
+that ran inside it.
+
+The stats go out three ways:
+- a Server-Timing header;
+- one JSON log line per request on the "clinic.requests" logger;
+- the per-route latency histograms served by /metrics.
+
+Work that runs after the headers are sent, such as streamed bodies, appears
+in the log line and metrics, but not in the header.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("clinic.requests")
+
+PHASES = ("db", "serialize", "render")
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class RequestStats:
+    """Counters for the request being handled"""
+
+    __slots__ = ("started", "queries") + PHASES
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = self.serialize = self.render = 0.0
+
+    def accounted(self):
+        """Seconds attributed to any phase so far"""
+        return self.db + self.serialize + self.render
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    """The RequestStats of the active request, or None outside one"""
+    if has_request_context():
+        return g.get("request_stats")
+    return None
+
+
+@contextmanager
+def timed(phase):
+    """Attribute the enclosed block's own time to a phase of the current request"""
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    started, accounted = time.perf_counter(), stats.accounted()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (stats.accounted() - accounted)
+        setattr(stats, phase, getattr(stats, phase) + elapsed)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._instrument_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    started = getattr(context, "_instrument_started", None)
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db += time.perf_counter() - started
+
+
+class RouteMetrics:
+    """Thread-safe per-route request counters and latency histograms"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def observe(self, route, status, duration_ms, stats, size):
+        with self.lock:
+            entry = self.routes.get(route)
+            if entry is None:
+                entry = self.routes[route] = {
+                    "count": 0, "errors": 0, "duration_ms_sum": 0.0,
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "queries_sum": 0, "bytes_sum": 0,
+                    **{f"{phase}_ms_sum": 0.0 for phase in PHASES},
+                }
+            entry["count"] += 1
+            entry["errors"] += status >= 500
+            entry["duration_ms_sum"] += duration_ms
+            entry["queries_sum"] += stats.queries
+            entry["bytes_sum"] += size or 0
+            for phase in PHASES:
+                entry[f"{phase}_ms_sum"] += getattr(stats, phase) * 1000
+            index = next((i for i, bound in enumerate(self.buckets) if duration_ms <= bound),
+                         len(self.buckets))
+            entry["buckets"][index] += 1
+
+    def snapshot(self):
+        """Per-route totals with cumulative histogram buckets"""
+        with self.lock:
+            routes = {route: dict(entry, buckets=list(entry["buckets"]))
+                      for route, entry in self.routes.items()}
+        for entry in routes.values():
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets + ("+Inf",), entry["buckets"]):
+                running += count
+                cumulative[str(bound)] = running
+            entry["buckets"] = cumulative
+            for key in ("duration_ms_sum", "bytes_sum") + tuple(f"{p}_ms_sum" for p in PHASES):
+                entry[key] = round(entry[key], 3)
+        return routes
+
+    def prometheus(self):
+        """The snapshot in the Prometheus text exposition format"""
+        lines = [
+            "# TYPE http_request_duration_ms histogram",
+            "# TYPE http_request_queries_total counter",
+            "# TYPE http_request_errors_total counter",
+            "# TYPE http_response_bytes_total counter",
+            "# TYPE http_request_phase_ms_total counter",
+        ]
+        for route, entry in sorted(self.snapshot().items()):
+            label = f'route="{route}"'
+            for bound, count in entry["buckets"].items():
+                lines.append(f'http_request_duration_ms_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f"http_request_duration_ms_sum{{{label}}} {entry['duration_ms_sum']}")
+            lines.append(f"http_request_duration_ms_count{{{label}}} {entry['count']}")
+            lines.append(f"http_request_queries_total{{{label}}} {entry['queries_sum']}")
+            lines.append(f"http_request_errors_total{{{label}}} {entry['errors']}")
+            lines.append(f"http_response_bytes_total{{{label}}} {entry['bytes_sum']}")
+            for phase in PHASES:
+                lines.append(f'http_request_phase_ms_total{{{label},phase="{phase}"}} '
+                             f"{entry[f'{phase}_ms_sum']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+
+metrics = RouteMetrics()
+
+
+def route_label():
+    """Metrics label for the matched view: the Resource class name, with the
+    report type for ReportResource"""
+    view = current_app.view_functions.get(request.endpoint)
+    view_class = getattr(view, "view_class", None)
+    if view_class is None:
+        return request.endpoint or "unmatched"
+    label = view_class.__name__
+    report_type = (request.view_args or {}).get("type")
+    known_types = getattr(view_class, "REPORT_TYPES", None)
+    if known_types is not None and report_type:
+        # Known types get their own series, errors included; unknown ones are pooled
+        label += f":{report_type}" if report_type in known_types else ":invalid"
+    return label
+
+
+def server_timing(stats, total):
+    """Server-Timing header value for the phases measured so far"""
+    parts = [f'db;dur={stats.db * 1000:.2f};desc="{stats.queries} queries"']
+    parts.extend(f"{phase};dur={getattr(stats, phase) * 1000:.2f}" for phase in PHASES[1:])
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _counted(body, counter):
+    """Pass a streamed body through, adding up its size"""
+    try:
+        for chunk in body:
+            counter[0] += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+
+def _start_request():
+    g.request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = g.get("request_stats")
+    if stats is None:
+        return response
+    response.headers["Server-Timing"] = server_timing(stats, stats.elapsed())
+
+    route = route_label()
+    method, path, status = request.method, request.full_path.rstrip("?"), response.status_code
+    size = [response.content_length]
+    if size[0] is None and response.is_streamed:
+        size[0] = 0
+        response.response = _counted(response.response, size)
+
+    def record():
+        duration_ms = stats.elapsed() * 1000
+        metrics.observe(route, status, duration_ms, stats, size[0])
+        logger.info(json.dumps({
+            "route": route, "method": method, "path": path, "status": status,
+            "duration_ms": round(duration_ms, 2), "queries": stats.queries,
+            **{f"{phase}_ms": round(getattr(stats, phase) * 1000, 2) for phase in PHASES},
+            "bytes": size[0],
+        }, separators=(",", ":")))
+
+    if response.direct_passthrough:
+        # Werkzeug hands passthrough bodies (send_file) to the server without
+        # the close hooks; they are fully built by now anyway
+        record()
+    else:
+        response.call_on_close(record)
+    return response
+
+
+def init_app(app):
+    """Install the request hooks and the request log handler"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
@@ -1,10 +1,16 @@
+from flask import current_app, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy_serializer import SerializerMixin
-from sqlalchemy import Enum
-from datetime import date
+from sqlalchemy import Enum, bindparam, case, event, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
+from serializers import dumps, serializer_for
+from replica import RoutingSession
+from datetime import date, datetime, timedelta
 import enum
+import json
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class PaymentMethod(enum.Enum):
     CASH = "CASH"
@@ -17,8 +23,37 @@ class ExpensePaymentMethod(enum.Enum):
     CASH = "CASH"
     MPESA = "MPESA"
 
+class DayClosedError(Exception):
+    """A write touched a day that has been closed"""
+
+    def __init__(self, target_date):
+        super().__init__(f"{target_date.isoformat()} is closed. Reopen the day to change it")
+        self.date = target_date
+
+# Bucket start date and label for each range bucketing
+RANGE_BUCKETS = {
+    'day': (lambda d: d, lambda d: d.isoformat()),
+    'week': (
+        lambda d: d - timedelta(days=d.weekday()),
+        lambda d: '{}-W{:02d}'.format(*d.isocalendar()[:2]),
+    ),
+    'month': (lambda d: d.replace(day=1), lambda d: f"{d.year}-{d.month:02d}"),
+    'year': (lambda d: d.replace(month=1, day=1), lambda d: str(d.year)),
+}
+
 class Collection(db.Model, SerializerMixin):
     __tablename__ = 'collections'
+    __table_args__ = (
+        # Day/month tallies filter on date and split by payment_method; on
+        # Postgres the index also carries amount so the SUMs are index-only
+        db.Index('ix_collections_date_payment_method', 'date', 'payment_method',
+                 postgresql_include=['amount']),
+        # Keyset listings page in (date, id) order
+        db.Index('ix_collections_date_id', 'date', 'id'),
+        # Doctor/procedure analytics over a date range; covering on Postgres
+        db.Index('ix_collections_date_doctor_procedure', 'date', 'doctor', 'procedure',
+                 postgresql_include=['payment_method', 'amount']),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     card_no = db.Column(db.String(50), nullable=False)
@@ -31,6 +66,11 @@ class Collection(db.Model, SerializerMixin):
 
 class Expense(db.Model, SerializerMixin):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        db.Index('ix_expenses_date_payment_method', 'date', 'payment_method',
+                 postgresql_include=['amount']),
+        db.Index('ix_expenses_date_id', 'date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     expense_name = db.Column(db.String(200), nullable=False)
@@ -39,17 +79,13 @@ class Expense(db.Model, SerializerMixin):
     date = db.Column(db.Date, default=date.today, nullable=False)
 
     @staticmethod
-    def get_day_tallies(target_date):
-        """Get all collections and expenses for a specific date with computed tallies"""
-        collections = Collection.query.filter_by(date=target_date).all()
-        expenses = Expense.query.filter_by(date=target_date).all()
-
-        # Compute collection totals by payment method
-        cash_total = sum(c.amount for c in collections if c.payment_method == PaymentMethod.CASH)
-        mpesa_total = sum(c.amount for c in collections if c.payment_method == PaymentMethod.MPESA)
-        till_total = sum(c.amount for c in collections if c.payment_method == PaymentMethod.TILL)
-        invoice_total = sum(c.amount for c in collections if c.payment_method == PaymentMethod.INVOICE)
-        card_total = sum(c.amount for c in collections if c.payment_method == PaymentMethod.CARD)
+    def compute_totals(method_totals, total_expenses):
+        """Derive the report totals from per-payment-method collection sums"""
+        cash_total = method_totals.get(PaymentMethod.CASH, 0)
+        mpesa_total = method_totals.get(PaymentMethod.MPESA, 0)
+        till_total = method_totals.get(PaymentMethod.TILL, 0)
+        invoice_total = method_totals.get(PaymentMethod.INVOICE, 0)
+        card_total = method_totals.get(PaymentMethod.CARD, 0)
 
         # Mobile money total with till deduction
         mobile_money_total = till_total * 0.9945 + mpesa_total
@@ -57,9 +93,6 @@ class Expense(db.Model, SerializerMixin):
         # Gross collections
         gross_collections = cash_total + mobile_money_total + invoice_total + card_total
 
-        # Total expenses
-        total_expenses = sum(e.amount for e in expenses)
-
         # Net total
         net_total = gross_collections - total_expenses
 
@@ -67,33 +100,73 @@ class Expense(db.Model, SerializerMixin):
         cash_in_hand = (mobile_money_total + cash_total) - total_expenses
 
         return {
-            'date': target_date.isoformat(),
-            'collections': [c.to_dict() for c in collections],
-            'expenses': [e.to_dict() for e in expenses],
-            'totals': {
-                'cash_total': cash_total,
-                'mpesa_total': mpesa_total,
-                'till_total': till_total,
-                'invoice_total': invoice_total,
-                'card_total': card_total,
-                'mobile_money_total': mobile_money_total,
-                'gross_collections': gross_collections,
-                'total_expenses': total_expenses,
-                'net_total': net_total,
-                'cash_in_hand': cash_in_hand
-            }
+            'cash_total': cash_total,
+            'mpesa_total': mpesa_total,
+            'till_total': till_total,
+            'invoice_total': invoice_total,
+            'card_total': card_total,
+            'mobile_money_total': mobile_money_total,
+            'gross_collections': gross_collections,
+            'total_expenses': total_expenses,
+            'net_total': net_total,
+            'cash_in_hand': cash_in_hand
         }
 
     @staticmethod
-    def get_month_tallies(month, year):
-        """Get monthly summary for all days in the month"""
+    def get_day_tallies(target_date, include_rows=True):
+        """Get all collections and expenses for a specific date with computed tallies.
+
+        Totals are read from the day's DailySummary row; collections and
+        expenses are only loaded when include_rows is True.
+        """
+        summary = db.session.get(DailySummary, target_date)
+
+        day_data = {'date': target_date.isoformat()}
+        if include_rows:
+            for key, model in (('collections', Collection), ('expenses', Expense)):
+                serializer = serializer_for(model)
+                rows = db.session.execute(
+                    select(*serializer.columns)
+                    .where(model.date == target_date)
+                    .order_by(model.id)
+                )
+                day_data[key] = serializer.many(rows)
+        day_data['totals'] = DailySummary.totals_for(summary)
+        return day_data
+
+    @staticmethod
+    def get_month_tallies(month, year, include_rows=True):
+        """Get monthly summary for all days in the month.
+
+        Totals come from the month's DailySummary rows in one query; the
+        row-level collections/expenses lists cost one more query each and are
+        left out entirely when include_rows is False.
+        """
         from calendar import monthrange
-        import datetime
 
         start_date = date(year, month, 1)
         _, last_day = monthrange(year, month)
         end_date = date(year, month, last_day)
 
+        summaries = DailySummary.query.filter(
+            DailySummary.date.between(start_date, end_date),
+            (DailySummary.collections_count > 0) | (DailySummary.expenses_count > 0)
+        ).order_by(DailySummary.date).all()
+
+        if include_rows:
+            # Serialized rows grouped by their ISO date
+            rows_by_day = {}
+            for key, model in (('collections', Collection), ('expenses', Expense)):
+                serializer = serializer_for(model)
+                by_day = rows_by_day[key] = {}
+                for row in db.session.execute(
+                    select(*serializer.columns)
+                    .where(model.date.between(start_date, end_date))
+                    .order_by(model.date, model.id)
+                ):
+                    item = serializer.row_to_dict(row)
+                    by_day.setdefault(item['date'], []).append(item)
+
         daily_summaries = []
         monthly_totals = {
             'total_gross_collections': 0,
@@ -102,19 +175,709 @@ class Expense(db.Model, SerializerMixin):
             'days_count': 0
         }
 
-        current_date = start_date
-        while current_date <= end_date:
-            day_data = Expense.get_day_tallies(current_date)
-            if day_data['collections'] or day_data['expenses']:  # Only include days with data
-                daily_summaries.append(day_data)
-                monthly_totals['total_gross_collections'] += day_data['totals']['gross_collections']
-                monthly_totals['total_expenses'] += day_data['totals']['total_expenses']
-                monthly_totals['total_net'] += day_data['totals']['net_total']
-                monthly_totals['days_count'] += 1
-            current_date += datetime.timedelta(days=1)
+        for summary in summaries:
+            totals = DailySummary.totals_for(summary)
+            day_data = {'date': summary.date.isoformat()}
+            if include_rows:
+                day_data['collections'] = rows_by_day['collections'].get(day_data['date'], [])
+                day_data['expenses'] = rows_by_day['expenses'].get(day_data['date'], [])
+            day_data['totals'] = totals
+
+            daily_summaries.append(day_data)
+            monthly_totals['total_gross_collections'] += totals['gross_collections']
+            monthly_totals['total_expenses'] += totals['total_expenses']
+            monthly_totals['total_net'] += totals['net_total']
+            monthly_totals['days_count'] += 1
 
         return {
             'month': f"{year}-{month:02d}",
             'daily_summaries': daily_summaries,
             'monthly_totals': monthly_totals
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def get_range_tallies(start_date, end_date, bucket='day'):
+        """Totals for an arbitrary date range, grouped into day/week/month/year buckets.
+
+        Reads the range's DailySummary rows in one query and sums the raw
+        per-method amounts per bucket before deriving the report totals, so
+        the till deduction and cash in hand match the day report.
+        """
+        bucket_start, bucket_label = RANGE_BUCKETS[bucket]
+
+        summaries = DailySummary.query.filter(
+            DailySummary.date.between(start_date, end_date),
+            (DailySummary.collections_count > 0) | (DailySummary.expenses_count > 0)
+        ).order_by(DailySummary.date)
+
+        buckets = {}
+        overall = DailySummary.empty_sums()
+        for summary in summaries:
+            key = bucket_start(summary.date)
+            if key not in buckets:
+                buckets[key] = {
+                    'first': summary.date,
+                    'last': summary.date,
+                    'days_count': 0,
+                    'sums': DailySummary.empty_sums(),
+                }
+            entry = buckets[key]
+            entry['last'] = summary.date
+            entry['days_count'] += 1
+            summary.add_to(entry['sums'])
+            summary.add_to(overall)
+
+        return {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'bucket': bucket,
+            'buckets': [
+                {
+                    'bucket': bucket_label(key),
+                    'first_date': entry['first'].isoformat(),
+                    'last_date': entry['last'].isoformat(),
+                    'days_count': entry['days_count'],
+                    'totals': DailySummary.totals_from_sums(entry['sums']),
+                }
+                for key, entry in buckets.items()
+            ],
+            'totals': DailySummary.totals_from_sums(overall),
+            'days_count': sum(entry['days_count'] for entry in buckets.values()),
+        }
+
+
+class DailySummary(db.Model, SerializerMixin):
+    """Per-day rollup of collections and expenses.
+
+    Maintained in the same transaction as every collection/expense write via
+    apply_collection/apply_expense, so report totals never have to scan the
+    base tables.
+    """
+    __tablename__ = 'daily_summaries'
+
+    METHOD_COLUMNS = {
+        PaymentMethod.CASH: 'cash_total',
+        PaymentMethod.MPESA: 'mpesa_total',
+        PaymentMethod.TILL: 'till_total',
+        PaymentMethod.INVOICE: 'invoice_total',
+        PaymentMethod.CARD: 'card_total',
+    }
+    SUM_COLUMNS = tuple(METHOD_COLUMNS.values()) + ('expenses_total',)
+    COUNT_COLUMNS = ('collections_count', 'expenses_count')
+    # Ways compute_from_base can recompute the rollup
+    ENGINES = ('sql', 'numpy')
+
+    date = db.Column(db.Date, primary_key=True)
+    cash_total = db.Column(db.Float, nullable=False, default=0)
+    mpesa_total = db.Column(db.Float, nullable=False, default=0)
+    till_total = db.Column(db.Float, nullable=False, default=0)
+    invoice_total = db.Column(db.Float, nullable=False, default=0)
+    card_total = db.Column(db.Float, nullable=False, default=0)
+    expenses_total = db.Column(db.Float, nullable=False, default=0)
+    collections_count = db.Column(db.Integer, nullable=False, default=0)
+    expenses_count = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped on every change; report ETags are derived from it
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime)
+    # Set while the day is closed and served from its DaySnapshot
+    closed_at = db.Column(db.DateTime)
+
+    @staticmethod
+    def totals_for(summary):
+        """Report totals for a summary row (all zeros when there is no row)"""
+        if summary is None:
+            return Expense.compute_totals({}, 0)
+        method_totals = {
+            method: getattr(summary, column)
+            for method, column in DailySummary.METHOD_COLUMNS.items()
+        }
+        return Expense.compute_totals(method_totals, summary.expenses_total)
+
+    @staticmethod
+    def empty_sums():
+        """Zeroed per-column sums, keyed like the rollup columns"""
+        return dict.fromkeys(DailySummary.SUM_COLUMNS, 0)
+
+    def add_to(self, sums):
+        """Accumulate this row's sums into a dict from empty_sums()"""
+        for column in DailySummary.SUM_COLUMNS:
+            sums[column] += getattr(self, column)
+
+    @staticmethod
+    def totals_from_sums(sums):
+        """Report totals from accumulated rollup sums"""
+        method_totals = {
+            method: sums[column]
+            for method, column in DailySummary.METHOD_COLUMNS.items()
+        }
+        return Expense.compute_totals(method_totals, sums['expenses_total'])
+
+    @staticmethod
+    def data_version(start_date, end_date):
+        """Cheap version token and last-modified time for a date range.
+
+        Versions only ever increase, so their sum changes whenever any day in
+        the range does.
+        """
+        version, days, updated_at = db.session.query(
+            func.coalesce(func.sum(DailySummary.version), 0),
+            func.count(DailySummary.date),
+            func.max(DailySummary.updated_at),
+        ).filter(DailySummary.date.between(start_date, end_date)).one()
+        return f"{days}.{version}", updated_at
+
+    @staticmethod
+    def _locked(target_date):
+        """Fetch the summary row for update, creating an empty one if needed.
+
+        Every write to collections or expenses comes through here, so this is
+        where writes to closed days are refused, or reopen the day, depending
+        on CLOSED_DAY_WRITES.
+        """
+        summary = DailySummary._get_for_update(target_date)
+        if summary.closed_at is not None:
+            if current_app.config.get('CLOSED_DAY_WRITES', 'reject') != 'reopen':
+                raise DayClosedError(target_date)
+            reason = f"{request.method} {request.path}" if has_request_context() else 'write'
+            DaySnapshot.reopen_locked(summary, reason=reason)
+        summary.touch()
+        return summary
+
+    @staticmethod
+    def _get_for_update(target_date):
+        """Fetch a summary row with a row lock, adding an empty one if missing.
+
+        FOR UPDATE cannot lock a row that doesn't exist yet, so two first
+        writes to a day would both insert it. The empty row is inserted with
+        ON CONFLICT DO NOTHING instead, and then locked like any other: the
+        loser of the race waits for the winner's row and only locks it.
+        """
+        summary = db.session.get(DailySummary, target_date, with_for_update=True)
+        if summary is None:
+            if DailySummary._insert_empty(target_date):
+                DailyBalance.stage_day(target_date)
+            summary = db.session.get(DailySummary, target_date, with_for_update=True)
+        return summary
+
+    @staticmethod
+    def lock_days(*dates):
+        """Lock the summary rows of several days in date order.
+
+        Writers that touch more than one day take their locks in ascending
+        date order, as the batch applies do, so they can't deadlock.
+        """
+        for target_date in sorted(set(dates)):
+            DailySummary._get_for_update(target_date)
+
+    @staticmethod
+    def _insert_empty(target_date):
+        """Insert a zeroed summary row unless the day has one; True if this added it"""
+        values = dict.fromkeys(DailySummary.SUM_COLUMNS + DailySummary.COUNT_COLUMNS, 0)
+        values.update(date=target_date, version=0)
+        dialect = db.session.get_bind(DailySummary).dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            # No portable ON CONFLICT; a savepoint keeps the transaction usable
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(DailySummary.__table__).values(values))
+                return True
+            except IntegrityError:
+                return False
+        result = db.session.execute(
+            dialect_insert(DailySummary.__table__).values(values)
+            .on_conflict_do_nothing(index_elements=['date'])
+        )
+        return result.rowcount == 1
+
+    def touch(self):
+        """Mark the row as changed"""
+        self.version += 1
+        self.updated_at = datetime.utcnow()
+
+    @staticmethod
+    def apply_collection(target_date, payment_method, amount, sign=1, count=1):
+        """Add (sign=1) or remove (sign=-1) collections from the rollup.
+
+        count lets a caller apply several rows' summed amount at once.
+        """
+        summary = DailySummary._locked(target_date)
+        column = DailySummary.METHOD_COLUMNS[payment_method]
+        previous = getattr(summary, column)
+        setattr(summary, column, round(previous + sign * (amount or 0), 2))
+        summary.collections_count += sign * count
+        DailyBalance.stage(target_date, column, getattr(summary, column) - previous)
+        return summary
+
+    @staticmethod
+    def apply_expense(target_date, amount, sign=1, count=1):
+        """Add (sign=1) or remove (sign=-1) expenses from the rollup"""
+        summary = DailySummary._locked(target_date)
+        previous = summary.expenses_total
+        summary.expenses_total = round(previous + sign * (amount or 0), 2)
+        summary.expenses_count += sign * count
+        DailyBalance.stage(target_date, 'expenses_total', summary.expenses_total - previous)
+        return summary
+
+    @staticmethod
+    def apply_collection_batch(rows):
+        """Add many new collections (column dicts), one rollup update per date and method"""
+        groups = {}
+        for row in rows:
+            key = (row['date'], row['payment_method'])
+            amount, count = groups.get(key, (0, 0))
+            groups[key] = (amount + (row['amount'] or 0), count + 1)
+        for (target_date, payment_method), (amount, count) in sorted(groups.items(), key=lambda item: item[0][0]):
+            DailySummary.apply_collection(target_date, payment_method, amount, count=count)
+
+    @staticmethod
+    def apply_expense_batch(rows):
+        """Add many new expenses (column dicts), one rollup update per date"""
+        groups = {}
+        for row in rows:
+            amount, count = groups.get(row['date'], (0, 0))
+            groups[row['date']] = (amount + row['amount'], count + 1)
+        for target_date, (amount, count) in sorted(groups.items()):
+            DailySummary.apply_expense(target_date, amount, count=count)
+
+    @staticmethod
+    def compute_from_base(start_date=None, end_date=None, engine='sql'):
+        """Recompute rollup values from the base tables, keyed by date.
+
+        One grouped statement per table: collections are split per payment
+        method with SUM(CASE ...) aggregates. engine='numpy' hands the work to
+        the columnar engine instead, which suits multi-month ranges.
+        """
+        if engine == 'numpy':
+            import columnar
+            return columnar.compute_from_base(start_date, end_date)
+
+        method_sums = [
+            func.coalesce(func.sum(case(
+                (Collection.payment_method == method, Collection.amount), else_=0
+            )), 0)
+            for method in DailySummary.METHOD_COLUMNS
+        ]
+        collection_query = db.session.query(
+            Collection.date, *method_sums, func.count(Collection.id)
+        )
+        expense_query = db.session.query(
+            Expense.date, func.coalesce(func.sum(Expense.amount), 0), func.count(Expense.id)
+        )
+        if start_date:
+            collection_query = collection_query.filter(Collection.date >= start_date)
+            expense_query = expense_query.filter(Expense.date >= start_date)
+        if end_date:
+            collection_query = collection_query.filter(Collection.date <= end_date)
+            expense_query = expense_query.filter(Expense.date <= end_date)
+
+        def empty():
+            values = dict.fromkeys(DailySummary.SUM_COLUMNS, 0)
+            values.update(dict.fromkeys(DailySummary.COUNT_COLUMNS, 0))
+            return values
+
+        rollup = {}
+        for row in collection_query.group_by(Collection.date):
+            values = rollup.setdefault(row[0], empty())
+            for column, amount in zip(DailySummary.METHOD_COLUMNS.values(), row[1:-1]):
+                values[column] = round(amount, 2)
+            values['collections_count'] = row[-1]
+        for day, amount, count in expense_query.group_by(Expense.date):
+            values = rollup.setdefault(day, empty())
+            values['expenses_total'] = round(amount, 2)
+            values['expenses_count'] = count
+        return rollup
+
+    @staticmethod
+    def verify(start_date=None, end_date=None, tolerance=0.005, engine='sql'):
+        """Compare the rollup with the base tables and return any drift.
+
+        Each entry is (date, column, stored_value, expected_value).
+        """
+        expected = DailySummary.compute_from_base(start_date, end_date, engine)
+        query = DailySummary.query
+        if start_date:
+            query = query.filter(DailySummary.date >= start_date)
+        if end_date:
+            query = query.filter(DailySummary.date <= end_date)
+        stored = {s.date: s for s in query}
+
+        drift = []
+        for day in sorted(set(expected) | set(stored)):
+            summary = stored.get(day)
+            values = expected.get(day)
+            for column in DailySummary.SUM_COLUMNS + DailySummary.COUNT_COLUMNS:
+                have = getattr(summary, column) if summary else 0
+                want = values[column] if values else 0
+                if abs(have - want) > tolerance:
+                    drift.append((day, column, have, want))
+        return drift
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None, engine='sql'):
+        """Bring the rollup rows in the range in line with the base tables.
+
+        Rows are updated in place rather than replaced so that their versions
+        keep increasing; only rows whose values change are touched.
+        """
+        expected = DailySummary.compute_from_base(start_date, end_date, engine)
+        query = DailySummary.query
+        if start_date:
+            query = query.filter(DailySummary.date >= start_date)
+        if end_date:
+            query = query.filter(DailySummary.date <= end_date)
+        stored = {s.date: s for s in query}
+
+        columns = DailySummary.SUM_COLUMNS + DailySummary.COUNT_COLUMNS
+        for day in set(expected) | set(stored):
+            values = expected.get(day) or dict.fromkeys(columns, 0)
+            summary = stored.get(day)
+            if summary is None:
+                summary = DailySummary(date=day, version=0)
+                db.session.add(summary)
+            elif all(getattr(summary, column) == values[column] for column in columns):
+                continue
+            for column in columns:
+                setattr(summary, column, values[column])
+            summary.touch()
+        db.session.flush()
+        DailyBalance.rebuild(start_date)
+        db.session.commit()
+        return len(expected)
+
+
+class DailyBalance(db.Model):
+    """Running totals of the rollup sums, for balances over any span.
+
+    Each row holds the sums of every daily_summaries row up to and including
+    its date, with one row per summarized day. Changes staged during a
+    transaction are applied by apply() at commit, under LOCK_KEY on Postgres.
+    """
+    __tablename__ = 'daily_balances'
+
+    # pg_advisory_xact_lock key serializing apply() across the app
+    LOCK_KEY = 25020
+
+    date = db.Column(db.Date, primary_key=True)
+    cash_total = db.Column(db.Float, nullable=False, default=0)
+    mpesa_total = db.Column(db.Float, nullable=False, default=0)
+    till_total = db.Column(db.Float, nullable=False, default=0)
+    invoice_total = db.Column(db.Float, nullable=False, default=0)
+    card_total = db.Column(db.Float, nullable=False, default=0)
+    expenses_total = db.Column(db.Float, nullable=False, default=0)
+
+    @staticmethod
+    def _staged(target_date):
+        changes = db.session.info.setdefault('balance_changes', {})
+        day = changes.get(target_date)
+        if day is None:
+            day = changes[target_date] = {'new': False, 'deltas': DailySummary.empty_sums()}
+        return day
+
+    @staticmethod
+    def stage(target_date, column, delta):
+        """Record a change to a day's rollup sum, to apply at commit"""
+        if delta:
+            DailyBalance._staged(target_date)['deltas'][column] += delta
+
+    @staticmethod
+    def stage_day(target_date):
+        """Record that a day got its summary row, so it needs a row here too"""
+        DailyBalance._staged(target_date)['new'] = True
+
+    @staticmethod
+    def _lock():
+        if db.session.get_bind().dialect.name == 'postgresql':
+            db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': DailyBalance.LOCK_KEY})
+
+    @staticmethod
+    def _latest(target_date, inclusive=True):
+        """(date, sums) of the latest row on (or before) target_date, or None"""
+        columns = [getattr(DailyBalance, column) for column in DailySummary.SUM_COLUMNS]
+        bound = DailyBalance.date <= target_date if inclusive else DailyBalance.date < target_date
+        row = db.session.execute(
+            select(DailyBalance.date, *columns).where(bound)
+            .order_by(DailyBalance.date.desc()).limit(1)
+        ).first()
+        if row is None:
+            return None
+        return row[0], dict(zip(DailySummary.SUM_COLUMNS, row[1:]))
+
+    @staticmethod
+    def apply(changes):
+        """Apply the staged changes of a transaction to the running totals.
+
+        New days are inserted first, each copying the committed totals of
+        the day before it. The changed dates then split the table into
+        segments [d1, d2), [d2, d3) ... [dn, end), and each segment gets one
+        UPDATE adding the cumulative change up to its first date, so every
+        row is rewritten at most once however many days changed.
+        """
+        DailyBalance._lock()
+        table = DailyBalance.__table__
+        for target_date in sorted(changes):
+            if changes[target_date]['new']:
+                latest = DailyBalance._latest(target_date, inclusive=False)
+                sums = latest[1] if latest else DailySummary.empty_sums()
+                db.session.execute(insert(table).values(date=target_date, **sums))
+
+        running = DailySummary.empty_sums()
+        segments = []
+        for target_date in sorted(changes):
+            deltas = changes[target_date]['deltas']
+            if any(deltas.values()):
+                for column, delta in deltas.items():
+                    running[column] += delta
+                segments.append((target_date, dict(running)))
+        if not segments:
+            return
+        # One statement, executed once per segment
+        values = {column: table.c[column] + bindparam(f'{column}_delta') for column in DailySummary.SUM_COLUMNS}
+        bounded = [
+            dict({f'{column}_delta': delta for column, delta in sums.items()}, start=start, end=end)
+            for (start, sums), (end, _) in zip(segments, segments[1:])
+            if any(sums.values())
+        ]
+        if bounded:
+            db.session.execute(
+                update(table).where(table.c.date >= bindparam('start'), table.c.date < bindparam('end'))
+                .values(values),
+                bounded,
+            )
+        # Past the last changed date the changes may cancel out, e.g. a row moved to a later day
+        start, sums = segments[-1]
+        tail = {column: table.c[column] + delta for column, delta in sums.items() if delta}
+        if tail:
+            db.session.execute(update(table).where(table.c.date >= start).values(tail))
+
+    @staticmethod
+    def as_of(target_date):
+        """Rollup sums from the first day up to and including target_date"""
+        latest = DailyBalance._latest(target_date)
+        sums = latest[1] if latest else DailySummary.empty_sums()
+        return {column: round(value, 2) for column, value in sums.items()}
+
+    @staticmethod
+    def expected(start_date=None):
+        """Running totals recomputed from daily_summaries, keyed by date"""
+        running = DailyBalance.as_of(start_date - timedelta(days=1)) if start_date else DailySummary.empty_sums()
+        query = DailySummary.query.order_by(DailySummary.date)
+        if start_date:
+            query = query.filter(DailySummary.date >= start_date)
+        expected = {}
+        for summary in query:
+            summary.add_to(running)
+            expected[summary.date] = {column: round(value, 2) for column, value in running.items()}
+        return expected
+
+    @staticmethod
+    def rebuild(start_date=None):
+        """Recompute the running totals from start_date on, in the caller's transaction"""
+        DailyBalance._lock()
+        expected = DailyBalance.expected(start_date)
+        delete = DailyBalance.__table__.delete()
+        if start_date:
+            delete = delete.where(DailyBalance.date >= start_date)
+        db.session.execute(delete)
+        if expected:
+            db.session.execute(
+                insert(DailyBalance),
+                [dict(values, date=day) for day, values in expected.items()],
+            )
+        return len(expected)
+
+    @staticmethod
+    def verify(tolerance=0.005):
+        """Compare the running totals with daily_summaries and return any drift.
+
+        Each entry is (date, column, stored_value, expected_value). Days
+        without a row of their own are checked as as_of() reads them.
+        """
+        stored = {
+            balance.date: {column: getattr(balance, column) for column in DailySummary.SUM_COLUMNS}
+            for balance in DailyBalance.query
+        }
+        expected = DailyBalance.expected()
+        have, want = DailySummary.empty_sums(), DailySummary.empty_sums()
+        drift = []
+        for day in sorted(set(expected) | set(stored)):
+            have = stored.get(day, have)
+            want = expected.get(day, want)
+            for column in DailySummary.SUM_COLUMNS:
+                if abs(have[column] - want[column]) > tolerance:
+                    drift.append((day, column, have[column], want[column]))
+        return drift
+
+
+@event.listens_for(db.session, 'before_commit')
+def _apply_balance_changes(session):
+    changes = session.info.pop('balance_changes', None)
+    if changes:
+        # Write the rows and rollup first, so the running totals are the
+        # transaction's last statements, as the rollup updates were before
+        session.flush()
+        DailyBalance.apply(changes)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_balance_changes(session):
+    session.info.pop('balance_changes', None)
+
+
+class DaySnapshot(db.Model):
+    """Frozen report data for a closed day.
+
+    payload holds the JSON-encoded get_day_tallies() output as it was at
+    close, so day and month reports over closed days are read straight from
+    here. The rendered daily xlsx is stored too when it was requested.
+    """
+    __tablename__ = 'day_snapshots'
+
+    date = db.Column(db.Date, primary_key=True)
+    totals = db.Column(db.JSON, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    xlsx = db.Column(db.LargeBinary)
+    collections_count = db.Column(db.Integer, nullable=False)
+    expenses_count = db.Column(db.Integer, nullable=False)
+    # The DailySummary version the snapshot was taken at
+    version = db.Column(db.Integer, nullable=False)
+    closed_at = db.Column(db.DateTime, nullable=False)
+    closed_by = db.Column(db.String(100))
+
+    def day_data(self):
+        """The get_day_tallies() output frozen in this snapshot"""
+        return json.loads(self.payload)
+
+    @staticmethod
+    def day_data_for(target_date):
+        """A closed day's frozen get_day_tallies() output, reading only its payload.
+
+        None if the day has no snapshot (it may have been reopened since).
+        """
+        payload = db.session.scalar(select(DaySnapshot.payload).where(DaySnapshot.date == target_date))
+        return json.loads(payload) if payload is not None else None
+
+    @staticmethod
+    def close(target_date, include_xlsx=False, actor=None):
+        """Freeze a day's report data and mark it closed; returns the snapshot.
+
+        Closing an already closed day returns its existing snapshot. The
+        summary row is locked first, so no write can land between reading
+        the day and closing it.
+        """
+        summary = DailySummary._get_for_update(target_date)
+        if summary.closed_at is not None:
+            return db.session.get(DaySnapshot, target_date)
+
+        day_data = Expense.get_day_tallies(target_date)
+        xlsx = None
+        if include_xlsx:
+            from resources.report_builder import DailyReportBuilder
+            xlsx = DailyReportBuilder(day_data['date'], day_data).build().getvalue()
+
+        now = datetime.utcnow()
+        summary.closed_at = now
+        snapshot = DaySnapshot(
+            date=target_date,
+            totals=day_data['totals'],
+            payload=dumps(day_data),
+            xlsx=xlsx,
+            collections_count=summary.collections_count,
+            expenses_count=summary.expenses_count,
+            version=summary.version,
+            closed_at=now,
+            closed_by=actor,
+        )
+        db.session.add(snapshot)
+        db.session.add(DayAuditEntry(date=target_date, action='close', actor=actor, created_at=now))
+        db.session.commit()
+        return snapshot
+
+    @staticmethod
+    def reopen(target_date, reason=None, actor=None):
+        """Reopen a closed day and drop its snapshot; returns False if it was open"""
+        summary = db.session.get(DailySummary, target_date, with_for_update=True)
+        if summary is None or summary.closed_at is None:
+            return False
+        DaySnapshot.reopen_locked(summary, reason=reason, actor=actor)
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def reopen_locked(summary, reason=None, actor=None):
+        """Reopen the day of an already locked summary row, in the caller's transaction"""
+        summary.closed_at = None
+        DaySnapshot.query.filter_by(date=summary.date).delete()
+        db.session.add(DayAuditEntry(
+            date=summary.date, action='reopen', actor=actor, reason=reason,
+            created_at=datetime.utcnow(),
+        ))
+
+    @staticmethod
+    def month_tallies(month, year, include_rows=True):
+        """get_month_tallies() output read from snapshots alone.
+
+        Returns None unless every day of the month with collections or
+        expenses is closed, in which case the caller computes it as usual.
+        """
+        from calendar import monthrange
+
+        start_date = date(year, month, 1)
+        end_date = date(year, month, monthrange(year, month)[1])
+        open_day = db.session.query(DailySummary.date).filter(
+            DailySummary.date.between(start_date, end_date),
+            DailySummary.closed_at.is_(None),
+            (DailySummary.collections_count > 0) | (DailySummary.expenses_count > 0)
+        ).first()
+        if open_day is not None:
+            return None
+
+        query = DaySnapshot.query.filter(
+            DaySnapshot.date.between(start_date, end_date),
+            (DaySnapshot.collections_count > 0) | (DaySnapshot.expenses_count > 0)
+        ).order_by(DaySnapshot.date)
+        if not include_rows:
+            query = query.options(defer(DaySnapshot.payload))
+        query = query.options(defer(DaySnapshot.xlsx))
+
+        daily_summaries = []
+        monthly_totals = {
+            'total_gross_collections': 0,
+            'total_expenses': 0,
+            'total_net': 0,
+            'days_count': 0
+        }
+        for snapshot in query:
+            totals = snapshot.totals
+            if include_rows:
+                day_data = snapshot.day_data()
+            else:
+                day_data = {'date': snapshot.date.isoformat(), 'totals': totals}
+            daily_summaries.append(day_data)
+            monthly_totals['total_gross_collections'] += totals['gross_collections']
+            monthly_totals['total_expenses'] += totals['total_expenses']
+            monthly_totals['total_net'] += totals['net_total']
+            monthly_totals['days_count'] += 1
+
+        if not daily_summaries:
+            return None
+        return {
+            'month': f"{year}-{month:02d}",
+            'daily_summaries': daily_summaries,
+            'monthly_totals': monthly_totals
+        }
+
+
+class DayAuditEntry(db.Model, SerializerMixin):
+    """Who closed or reopened a day, when and why"""
+    __tablename__ = 'day_audit_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    action = db.Column(db.String(20), nullable=False)
+    actor = db.Column(db.String(100))
+    reason = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False)
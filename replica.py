@@ -0,0 +1,102 @@
+"""Read/write split between the primary database and a read replica.
+
+When DATABASE_REPLICA_URL is set, it becomes the "replica" entry of
+SQLALCHEMY_BINDS. GET handlers wrapped in replica_reads then run their
+queries there, and everything else stays on the primary. A request still
+reads from the primary when:
+- it sends X-Read-Primary: 1;
+- the client wrote in the last DB_REPLICA_STICKY_SECONDS, so it sees its
+  own writes despite replication lag (tracked by a cookie);
+- the replica failed in the last DB_REPLICA_RETRY_SECONDS.
+
+A handler whose replica query fails with a connection-level error is rerun
+on the primary. A streamed body that has already started cannot switch
+over, but streamed listings and exports run their query before returning.
+"""
+import functools
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.sql.dml import UpdateBase
+
+BIND = "replica"
+STICKY_COOKIE = "read_primary"
+
+DEFAULTS = {
+    "DATABASE_REPLICA_URL": "",       # empty: no replica, every query goes to the primary
+    "DB_REPLICA_STICKY_SECONDS": 5,   # a client that wrote reads from the primary this long
+    "DB_REPLICA_RETRY_SECONDS": 30,   # after a replica failure, skip it this long
+}
+
+# Monotonic time until which the replica is skipped after a failure
+_down_until = 0.0
+
+
+def configured(app=None):
+    """Whether the app has a replica bind"""
+    app = app or current_app
+    return BIND in (app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+def _wants_primary():
+    if request.headers.get("X-Read-Primary", "").lower() in ("1", "true", "yes"):
+        return True
+    return STICKY_COOKIE in request.cookies
+
+
+def reading_replica():
+    """Whether the current request's reads are routed to the replica"""
+    return has_request_context() and g.get("read_replica", False)
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of replica_reads handlers to the replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and reading_replica() and not self._flushing
+                and not isinstance(clause, UpdateBase)):
+            engine = self._db.engines.get(BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(handler):
+    """Run a read-only handler against the replica, falling back to the primary"""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        global _down_until
+        if not configured() or _wants_primary() or time.monotonic() < _down_until:
+            return handler(*args, **kwargs)
+
+        g.read_replica = True
+        try:
+            return handler(*args, **kwargs)
+        except (OperationalError, InterfaceError) as exc:
+            retry = current_app.config.get("DB_REPLICA_RETRY_SECONDS", DEFAULTS["DB_REPLICA_RETRY_SECONDS"])
+            _down_until = time.monotonic() + retry
+            current_app.logger.warning("Replica read failed, using the primary for %ss: %s",
+                                       retry, exc.orig or exc)
+            g.read_replica = False
+            current_app.extensions["sqlalchemy"].session.rollback()
+            return handler(*args, **kwargs)
+    return wrapper
+
+
+def _mark_writer(response):
+    """Pin a client that just wrote to the primary for its next reads"""
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        sticky = current_app.config.get("DB_REPLICA_STICKY_SECONDS", DEFAULTS["DB_REPLICA_STICKY_SECONDS"])
+        response.set_cookie(STICKY_COOKIE, "1", max_age=sticky, httponly=True, samesite="Lax")
+    return response
+
+
+def init_app(app):
+    """Register the replica bind and the write cookie, if a replica is configured"""
+    url = app.config.get("DATABASE_REPLICA_URL")
+    if url:
+        app.config.setdefault("SQLALCHEMY_BINDS", {})[BIND] = url
+    if configured(app):
+        app.after_request(_mark_writer)
@@ -0,0 +1,104 @@
+from flask_restful import Resource
+from flask import request
+from sqlalchemy import case, func, select
+from models import db, Collection, Expense, PaymentMethod
+from replica import replica_reads
+from datetime import datetime
+
+GROUPINGS = {
+    'doctor': ('doctor',),
+    'procedure': ('procedure',),
+    'both': ('doctor', 'procedure'),
+}
+SORTS = ('revenue', 'visits', 'name')
+DEFAULT_TOP = 20
+MAX_TOP = 500
+
+
+class AnalyticsResource(Resource):
+    method_decorators = {'get': [replica_reads]}
+
+    def get(self):
+        """Revenue, visits and payment-method mix per doctor and/or procedure.
+
+        Query parameters: start/end (YYYY-MM-DD, optional), group_by
+        (doctor|procedure|both), sort (revenue|visits|name), order
+        (desc|asc) and top (number of groups returned).
+        """
+        args = request.args
+        try:
+            start_date = datetime.strptime(args['start'], '%Y-%m-%d').date() if args.get('start') else None
+            end_date = datetime.strptime(args['end'], '%Y-%m-%d').date() if args.get('end') else None
+        except ValueError:
+            return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
+
+        group_by = args.get('group_by', 'doctor')
+        if group_by not in GROUPINGS:
+            return {'error': 'group_by must be doctor, procedure or both'}, 400
+        sort = args.get('sort', 'revenue')
+        if sort not in SORTS:
+            return {'error': 'sort must be revenue, visits or name'}, 400
+        order = args.get('order', 'asc' if sort == 'name' else 'desc')
+        if order not in ('asc', 'desc'):
+            return {'error': 'order must be asc or desc'}, 400
+        try:
+            top = int(args.get('top', DEFAULT_TOP))
+        except ValueError:
+            return {'error': 'top must be an integer'}, 400
+        if not 1 <= top <= MAX_TOP:
+            return {'error': f'top must be between 1 and {MAX_TOP}'}, 400
+
+        group_columns = [getattr(Collection, name) for name in GROUPINGS[group_by]]
+        revenue = func.coalesce(func.sum(Collection.amount), 0).label('revenue')
+        visits = func.count(Collection.id).label('visits')
+        method_sums = [
+            func.coalesce(func.sum(case(
+                (Collection.payment_method == method, Collection.amount), else_=0
+            )), 0)
+            for method in PaymentMethod
+        ]
+
+        sort_columns = {'revenue': [revenue], 'visits': [visits], 'name': group_columns}[sort]
+        if order == 'desc':
+            sort_columns = [column.desc() for column in sort_columns]
+
+        statement = select(*group_columns, revenue, visits, *method_sums)
+        if start_date:
+            statement = statement.where(Collection.date >= start_date)
+        if end_date:
+            statement = statement.where(Collection.date <= end_date)
+        statement = statement.group_by(*group_columns).order_by(*sort_columns, *group_columns).limit(top)
+
+        groups = []
+        keys_count = len(group_columns)
+        for row in db.session.execute(statement):
+            method_totals = dict(zip(PaymentMethod, row[keys_count + 2:]))
+            group = dict(zip(GROUPINGS[group_by], row[:keys_count]))
+            group.update(analytics_figures(row[keys_count], row[keys_count + 1], method_totals))
+            groups.append(group)
+
+        return {
+            'start': start_date.isoformat() if start_date else None,
+            'end': end_date.isoformat() if end_date else None,
+            'group_by': group_by,
+            'sort': sort,
+            'order': order,
+            'top': top,
+            'groups': groups,
+        }, 200
+
+
+def analytics_figures(revenue, visits, method_totals):
+    """Revenue, visits and payment-method mix for one group"""
+    totals = Expense.compute_totals(method_totals, 0)
+    return {
+        'revenue': revenue,
+        'visits': visits,
+        'average_per_visit': revenue / visits if visits else 0,
+        'gross_collections': totals['gross_collections'],
+        'payment_methods': {method.value: amount for method, amount in method_totals.items()},
+        'payment_mix': {
+            method.value: (amount / revenue if revenue else 0)
+            for method, amount in method_totals.items()
+        },
+    }
@@ -0,0 +1,212 @@
+# artifact_cache.py
+import atexit
+import hashlib
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from models import db, DailySummary
+
+DEFAULTS = {
+    "ARTIFACT_CACHE_MAX_BYTES": 64 * 1024 * 1024,   # memory budget for rendered files; 0 turns the cache off
+    "ARTIFACT_CACHE_DIR": "",                       # spill evicted files here; empty: drop them
+    "ARTIFACT_CACHE_DISK_BYTES": 512 * 1024 * 1024, # budget for the spill directory
+}
+COUNTERS = ("hits", "disk_hits", "misses", "evictions", "spills", "invalidations")
+
+
+class ArtifactCache:
+    """Bounded LRU cache of rendered report files.
+
+    Keys are (report type, start date, end date, data version), so a file is
+    never served for data that has changed since it was rendered. Committed
+    writes also invalidate every entry covering their date, which frees the
+    space early instead of waiting for LRU eviction.
+
+    Entries live in memory up to ARTIFACT_CACHE_MAX_BYTES. With
+    ARTIFACT_CACHE_DIR set, the least recently used entries are written to
+    a per-process directory under it instead of being dropped. That
+    directory is kept under ARTIFACT_CACHE_DISK_BYTES and removed at exit.
+    A disk hit moves the entry back into memory.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.disk = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.directory = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    @staticmethod
+    def _limits():
+        config = current_app.config
+        return tuple(config.get(name, DEFAULTS[name]) for name in DEFAULTS)
+
+    def get(self, key):
+        """The cached bytes for key, or None"""
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.counters["hits"] += 1
+                return data
+            spilled = self.disk.pop(key, None)
+            if spilled is None:
+                self.counters["misses"] += 1
+                return None
+            path, size = spilled
+            self.disk_bytes -= size
+            self.counters["disk_hits"] += 1
+        with open(path, "rb") as spill:
+            data = spill.read()
+        os.unlink(path)
+        self.put(key, data)
+        return data
+
+    def put(self, key, data):
+        """Cache data under key, evicting or spilling the least recently used entries"""
+        max_bytes, directory, disk_limit = self._limits()
+        if not max_bytes:
+            return
+        with self.lock:
+            if key in self.memory:
+                return
+            self.memory[key] = data
+            self.memory_bytes += len(data)
+            overflow = []
+            while self.memory_bytes > max_bytes and self.memory:
+                old_key, old_data = self.memory.popitem(last=False)
+                self.memory_bytes -= len(old_data)
+                overflow.append((old_key, old_data))
+        for old_key, old_data in overflow:
+            if directory:
+                self._spill(old_key, old_data, directory, disk_limit)
+            else:
+                with self.lock:
+                    self.counters["evictions"] += 1
+
+    def _spill(self, key, data, directory, disk_limit):
+        with self.lock:
+            if self.directory is None:
+                os.makedirs(directory, exist_ok=True)
+                self.directory = tempfile.mkdtemp(prefix=f"artifacts-{os.getpid()}-", dir=directory)
+                atexit.register(shutil.rmtree, self.directory, True)
+            path = os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest())
+        if len(data) > disk_limit:
+            with self.lock:
+                self.counters["evictions"] += 1
+            return
+        with open(path, "wb") as spill:
+            spill.write(data)
+        dropped = []
+        with self.lock:
+            self.disk[key] = (path, len(data))
+            self.disk_bytes += len(data)
+            self.counters["spills"] += 1
+            while self.disk_bytes > disk_limit:
+                _, (old_path, size) = self.disk.popitem(last=False)
+                self.disk_bytes -= size
+                self.counters["evictions"] += 1
+                dropped.append(old_path)
+        for old_path in dropped:
+            os.unlink(old_path)
+
+    def invalidate(self, dates):
+        """Drop every entry whose date span includes one of dates"""
+        if not self.memory and not self.disk:
+            return
+        dropped = []
+        with self.lock:
+            for store in (self.memory, self.disk):
+                for key in [key for key in store if any(key[1] <= day <= key[2] for day in dates)]:
+                    value = store.pop(key)
+                    if store is self.memory:
+                        self.memory_bytes -= len(value)
+                    else:
+                        self.disk_bytes -= value[1]
+                        dropped.append(value[0])
+                    self.counters["invalidations"] += 1
+        for path in dropped:
+            os.unlink(path)
+
+    def stats(self):
+        """Counters and current size, for /metrics"""
+        with self.lock:
+            return dict(
+                self.counters,
+                entries=len(self.memory), bytes=self.memory_bytes,
+                disk_entries=len(self.disk), disk_bytes=self.disk_bytes,
+            )
+
+    def prometheus(self):
+        """The stats in the Prometheus text exposition format"""
+        stats = self.stats()
+        lines = ["# TYPE artifact_cache_events_total counter"]
+        lines.extend(f'artifact_cache_events_total{{event="{name}"}} {stats[name]}' for name in COUNTERS)
+        lines.append("# TYPE artifact_cache_entries gauge")
+        lines.append("# TYPE artifact_cache_bytes gauge")
+        for tier, prefix in (("memory", ""), ("disk", "disk_")):
+            lines.append(f'artifact_cache_entries{{tier="{tier}"}} {stats[prefix + "entries"]}')
+            lines.append(f'artifact_cache_bytes{{tier="{tier}"}} {stats[prefix + "bytes"]}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self.lock:
+            paths = [path for path, _ in self.disk.values()]
+            self.memory.clear()
+            self.disk.clear()
+            self.memory_bytes = self.disk_bytes = 0
+            self.counters = dict.fromkeys(COUNTERS, 0)
+        for path in paths:
+            os.unlink(path)
+
+
+artifacts = ArtifactCache()
+
+
+def tee(key, chunks):
+    """Pass a streamed file through, caching it once it has been sent in full.
+
+    Run it under stream_with_context. Files larger than the memory budget
+    are sent but not cached.
+    """
+    limit = ArtifactCache._limits()[0]
+    parts, size = [], 0
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size > limit:
+                parts = None
+            else:
+                parts.append(chunk)
+        yield chunk
+    if parts is not None:
+        artifacts.put(key, b"".join(parts))
+
+
+@event.listens_for(db.session, "after_flush")
+def _capture(session, flush_context):
+    """Note the days written in this transaction, to invalidate after commit"""
+    if not artifacts.memory and not artifacts.disk:
+        return
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, DailySummary):
+            session.info.setdefault("artifact_dates", set()).add(obj.date)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate(session):
+    dates = session.info.pop("artifact_dates", None)
+    if dates:
+        artifacts.invalidate(dates)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard(session):
+    session.info.pop("artifact_dates", None)
@@ -0,0 +1,91 @@
+# bulk.py
+import csv
+import io
+import time
+from flask import request
+from sqlalchemy import insert
+from models import db, DayClosedError
+
+INSERT_BATCH_SIZE = 1000
+
+
+def read_bulk_rows():
+    """Read the rows of a bulk upload.
+
+    Accepts a JSON array (or {"rows": [...]}), a text/csv body, or a CSV file
+    uploaded as multipart field "file". Returns (rows, error).
+    """
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return None, 'Upload the CSV file as multipart field "file"'
+        return _decode_csv(upload.read())
+    if request.mimetype == 'text/csv':
+        return _decode_csv(request.get_data())
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        return None, 'Expected a JSON array of rows or a CSV upload'
+    return data, None
+
+
+def _decode_csv(data):
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return None, 'CSV must be UTF-8 encoded. Save it as "CSV UTF-8" and upload it again'
+    return _read_csv(text), None
+
+
+def _read_csv(text):
+    # Empty cells mean "not provided", like a missing JSON key
+    return [
+        {key: value for key, value in row.items() if key and value not in ('', None)}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+
+
+def bulk_insert(model, rows, validate, apply_rollup):
+    """Validate rows with the single-row rules and insert the valid ones.
+
+    Valid rows are inserted with batched executemany inserts and the rollup is
+    updated, all in one transaction. Invalid rows are reported by index and
+    skipped.
+    """
+    started = time.perf_counter()
+
+    valid, errors = [], []
+    for index, data in enumerate(rows):
+        if not isinstance(data, dict):
+            errors.append({'row': index, 'error': 'Row must be an object'})
+            continue
+        fields, error = validate(data)
+        if error:
+            errors.append({'row': index, 'error': error})
+        else:
+            valid.append(fields)
+
+    if not valid:
+        return {'inserted': 0, 'errors': errors}, 400
+
+    try:
+        for offset in range(0, len(valid), INSERT_BATCH_SIZE):
+            db.session.execute(insert(model), valid[offset:offset + INSERT_BATCH_SIZE])
+        apply_rollup(valid)
+        db.session.commit()
+    except DayClosedError as exc:
+        db.session.rollback()
+        return {'error': str(exc), 'errors': errors}, 409
+    except Exception:
+        db.session.rollback()
+        return {'error': f'Failed to save {model.__tablename__}', 'errors': errors}, 500
+
+    elapsed = time.perf_counter() - started
+    return {
+        'inserted': len(valid),
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(len(valid) / elapsed, 1) if elapsed else None,
+    }, 201
@@ -1,75 +1,122 @@
 from flask_restful import Resource
-from flask import request
-from models import db, Collection, PaymentMethod
-from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import select
+from models import db, Collection, DailySummary, DayClosedError, PaymentMethod
+from replica import replica_reads
+from datetime import datetime, date as date_type
+from serializers import serializer_for
+from .bulk import bulk_insert, read_bulk_rows
+from .conditional import not_modified, validator_headers, validators
+from .group_commit import DEFAULTS as GROUP_COMMIT_DEFAULTS, GroupCommitter
+from .listing import list_rows, parse_listing_args
+
+def validate_collection(data):
+    """Validate a new collection payload.
+
+    Returns (fields, error): the Collection column values, or an error message.
+    """
+    # Manual validation
+    required_fields = ['card_no', 'procedure', 'payment_method', 'amount', 'doctor']
+    for field in required_fields:
+        if field not in data or not data[field]:
+            return None, f'{field} is required'
+
+    if data['payment_method'] not in [pm.value for pm in PaymentMethod]:
+        return None, 'Invalid payment method'
+
+    if data['payment_method'] == 'invoice' and 'invoice_source' not in data:
+        return None, 'invoice_source is required for invoice payments'
+
+    if 'invoice_source' in data and data['payment_method'] != 'INVOICE':
+        return None, 'invoice_source should only be provided for invoice payments'
+
+    date = data.get('date')
+    if date:
+        try:
+            date = datetime.strptime(date, '%Y-%m-%d').date()
+        except ValueError:
+            return None, 'Invalid date format. Use YYYY-MM-DD'
+    else:
+        date = date_type.today()
+
+    try:
+        amount = float(data['amount'])
+    except (TypeError, ValueError):
+        return None, 'Invalid amount'
+
+    return {
+        'card_no': data['card_no'],
+        'procedure': data['procedure'],
+        'payment_method': PaymentMethod(data['payment_method']),
+        'invoice_source': data['invoice_source'] if 'invoice_source' in data else None,
+        'doctor': data['doctor'],
+        'amount': amount,
+        'date': date,
+    }, None
+
+
+collection_writes = GroupCommitter(
+    Collection, DailySummary.apply_collection_batch, 'Failed to save collection'
+)
+
 
 class CollectionResource(Resource):
+    method_decorators = {'get': [replica_reads]}
+
     def get(self, date=None):
         if date:
             try:
                 target_date = datetime.strptime(date, '%Y-%m-%d').date()
-                collections = Collection.query.filter_by(date=target_date).all()
-                return [c.to_dict() for c in collections], 200
+                etag, last_modified = validators(target_date)
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+
+                serializer = serializer_for(Collection)
+                rows = db.session.execute(
+                    select(*serializer.columns).where(Collection.date == target_date)
+                )
+                return serializer.many(rows), 200, validator_headers(etag, last_modified)
             except ValueError:
                 return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
         else:
-            collections = Collection.query.all()
-            return [c.to_dict() for c in collections], 200
+            options, error = parse_listing_args(request.args)
+            if error:
+                return {'error': error}, 400
+            return list_rows(Collection, options)
 
     def post(self):
         data = request.get_json()
 
-        # Manual validation
-        required_fields = ['card_no', 'procedure', 'payment_method', 'amount', 'doctor']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return {'error': f'{field} is required'}, 400
-
-        if data['payment_method'] not in [pm.value for pm in PaymentMethod]:
-            return {'error': 'Invalid payment method'}, 400
+        fields, error = validate_collection(data)
+        if error:
+            return {'error': error}, 400
 
-        if data['payment_method'] == 'invoice' and 'invoice_source' not in data:
-            return {'error': 'invoice_source is required for invoice payments'}, 400
+        if current_app.config.get('GROUP_COMMIT_COLLECTIONS', GROUP_COMMIT_DEFAULTS['GROUP_COMMIT_COLLECTIONS']):
+            return collection_writes.submit(fields)
 
-        if 'invoice_source' in data and data['payment_method'] != 'INVOICE':
-            return {'error': 'invoice_source should only be provided for invoice payments'}, 400
-
-        date = data.get('date')
-        if date:
-            try:
-                date = datetime.strptime(date, '%Y-%m-%d').date()
-            except ValueError:
-                return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
-        else:
-            from datetime import date
-            date = date.today()
-
-        amount = float(data['amount'])
-
-        collection = Collection(
-            card_no=data['card_no'],
-            procedure=data['procedure'],
-            payment_method=PaymentMethod(data['payment_method']),
-            invoice_source=data['invoice_source'] if 'invoice_source' in data else None,
-            doctor = data['doctor'],
-            amount=amount,
-            date=date
-        )
+        collection = Collection(**fields)
 
         try:
             db.session.add(collection)
+            DailySummary.apply_collection(collection.date, collection.payment_method, collection.amount)
             db.session.commit()
-            return collection.to_dict(), 201
+            return serializer_for(Collection).to_dict(collection), 201
+        except DayClosedError as exc:
+            db.session.rollback()
+            return {'error': str(exc)}, 409
         except Exception:
             db.session.rollback()
             return {'error': 'Failed to save collection'}, 500
         
     def patch(self, collection_id):
-        collection = Collection.query.get(collection_id)
+        # Locked, so concurrent edits can't both take out the same previous values
+        collection = db.session.get(Collection, collection_id, with_for_update=True)
         if not collection:
             return {'error': 'Collection not found'}, 404
 
         data = request.get_json()
+        previous = (collection.date, collection.payment_method, collection.amount)
 
         if 'card_no' in data:
             collection.card_no = data['card_no']
@@ -93,22 +140,42 @@ class CollectionResource(Resource):
                 return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
 
         try:
+            # Moves between dates/payment methods: take the old values out, add the new ones
+            if collection.date != previous[0]:
+                DailySummary.lock_days(previous[0], collection.date)
+            DailySummary.apply_collection(*previous, sign=-1)
+            DailySummary.apply_collection(collection.date, collection.payment_method, collection.amount)
             db.session.commit()
-            return collection.to_dict(), 200
+            return serializer_for(Collection).to_dict(collection), 200
+        except DayClosedError as exc:
+            db.session.rollback()
+            return {'error': str(exc)}, 409
         except Exception:
             db.session.rollback()
             return {'error': 'Failed to update collection'}, 500
         
     def delete(self, collection_id):
-        collection = Collection.query.get(collection_id)
+        collection = db.session.get(Collection, collection_id, with_for_update=True)
         if not collection:
             return {'error': 'Collection not found'}, 404
 
         try:
             db.session.delete(collection)
+            DailySummary.apply_collection(collection.date, collection.payment_method, collection.amount, sign=-1)
             db.session.commit()
             return {'message': 'Collection deleted successfully'}, 200
+        except DayClosedError as exc:
+            db.session.rollback()
+            return {'error': str(exc)}, 409
         except Exception:
             db.session.rollback()
             return {'error': 'Failed to delete collection'}, 500
-                        
+
+
+class CollectionBulkResource(Resource):
+    def post(self):
+        rows, error = read_bulk_rows()
+        if error:
+            return {'error': error}, 400
+
+        return bulk_insert(Collection, rows, validate_collection, DailySummary.apply_collection_batch)
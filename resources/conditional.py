@@ -0,0 +1,64 @@
+# conditional.py
+import hashlib
+from datetime import timezone
+from flask import request
+from werkzeug.http import http_date
+from werkzeug.wrappers import Response
+from models import DailySummary
+
+
+def validators(start_date, end_date=None):
+    """ETag and Last-Modified for the current request over a date range.
+
+    Both come from the daily_summaries version counters, so computing them
+    never touches collection or expense rows. The request path and query
+    string are part of the ETag, so each representation gets its own.
+    """
+    return versioned_validators(*DailySummary.data_version(start_date, end_date or start_date))
+
+
+def versioned_validators(version, updated_at):
+    """ETag and Last-Modified for the current request from a data version token"""
+    etag = hashlib.sha1(f"{request.full_path}|{version}".encode()).hexdigest()[:20]
+    if updated_at is not None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+    return etag, updated_at
+
+
+def snapshot_version(snapshot):
+    """Data version token of a closed day, taken from its snapshot"""
+    return f"closed.{snapshot.version}.{snapshot.closed_at.isoformat()}", snapshot.closed_at
+
+
+def snapshot_validators(snapshot):
+    """ETag and Last-Modified for a closed day, taken from its snapshot"""
+    return versioned_validators(*snapshot_version(snapshot))
+
+
+def not_modified(etag, last_modified):
+    """Return a 304 response when the client's copy is current, else None"""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    response = Response(status=304)
+    return with_validators(response, etag, last_modified)
+
+
+def validator_headers(etag, last_modified):
+    """Headers carrying the validators, for (data, status, headers) returns"""
+    headers = {'ETag': f'"{etag}"'}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def with_validators(response, etag, last_modified):
+    """Attach the validators to a response object"""
+    response.headers.update(validator_headers(etag, last_modified))
+    return response
@@ -0,0 +1,54 @@
+# days.py
+from datetime import datetime
+from flask import request
+from flask_restful import Resource
+from models import db, DayAuditEntry, DaySnapshot
+
+DEFAULTS = {
+    "CLOSED_DAY_WRITES": "reject",  # or "reopen": a write reopens the day and drops its snapshot
+}
+
+
+def day_status(target_date):
+    """Whether a day is closed, with its audit trail"""
+    snapshot = db.session.get(DaySnapshot, target_date)
+    audit = DayAuditEntry.query.filter_by(date=target_date).order_by(DayAuditEntry.id)
+    return {
+        "date": target_date.isoformat(),
+        "closed": snapshot is not None,
+        "closed_at": snapshot.closed_at.strftime("%Y-%m-%d %H:%M:%S") if snapshot else None,
+        "closed_by": snapshot.closed_by if snapshot else None,
+        "has_xlsx": snapshot is not None and snapshot.xlsx is not None,
+        "audit": [entry.to_dict(only=("action", "actor", "reason", "created_at")) for entry in audit],
+    }
+
+
+class DayResource(Resource):
+    def get(self, date):
+        try:
+            target_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD"}, 400
+        return day_status(target_date), 200
+
+
+class DayActionResource(Resource):
+    def post(self, date, action):
+        """Close (optionally with its xlsx) or reopen a day"""
+        try:
+            target_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD"}, 400
+        data = request.get_json(silent=True) or {}
+
+        if action == "close":
+            DaySnapshot.close(target_date, include_xlsx=bool(data.get("include_xlsx")),
+                              actor=data.get("actor"))
+        elif action == "reopen":
+            if not data.get("reason"):
+                return {"error": "reason is required to reopen a day"}, 400
+            if not DaySnapshot.reopen(target_date, reason=data["reason"], actor=data.get("actor")):
+                return {"error": f"{date} is not closed"}, 409
+        else:
+            return {"error": "Invalid action. Use close or reopen"}, 400
+        return day_status(target_date), 200
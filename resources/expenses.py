@@ -1,72 +1,108 @@
 from flask_restful import Resource
 from flask import request
-from models import db, Expense, ExpensePaymentMethod
-from datetime import datetime
+from sqlalchemy import select
+from models import db, DailySummary, DayClosedError, Expense, ExpensePaymentMethod
+from replica import replica_reads
+from datetime import datetime, date as date_type
+from serializers import serializer_for
+from .bulk import bulk_insert, read_bulk_rows
+from .conditional import not_modified, validator_headers, validators
+from .listing import list_rows, parse_listing_args
 
-class ExpenseResource(Resource):
-    def get(self, date=None):
-        if date:
-            try:
-                target_date = datetime.strptime(date, '%Y-%m-%d').date()
-                expenses = Expense.query.filter_by(date=target_date).all()
-                return [e.to_dict() for e in expenses], 200
-            except ValueError:
-                return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
-        else:
-            expenses = Expense.query.all()
-            return [e.to_dict() for e in expenses], 200
+def validate_expense(data):
+    """Validate a new expense payload.
 
-    def post(self):
-        data = request.get_json()
+    Returns (fields, error): the Expense column values, or an error message.
+    """
+    # Manual validation
+    required_fields = ['expense_name', 'amount', 'payment_method']
+    for field in required_fields:
+        if field not in data or not data[field]:
+            return None, f'{field} is required'
 
-        # Manual validation
-        required_fields = ['expense_name', 'amount', 'payment_method']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return {'error': f'{field} is required'}, 400
+    if data['payment_method'] not in [pm.value for pm in ExpensePaymentMethod]:
+        return None, 'Invalid payment method. Must be cash or mpesa'
 
-        if data['payment_method'] not in [pm.value for pm in ExpensePaymentMethod]:
-            return {'error': 'Invalid payment method. Must be cash or mpesa'}, 400
+    try:
+        amount = float(data['amount'])
+        if amount <= 0:
+            return None, 'Amount must be positive'
+    except (TypeError, ValueError):
+        return None, 'Invalid amount'
 
+    date = data.get('date')
+    if date:
         try:
-            amount = float(data['amount'])
-            if amount <= 0:
-                return {'error': 'Amount must be positive'}, 400
+            date = datetime.strptime(date, '%Y-%m-%d').date()
         except ValueError:
-            return {'error': 'Invalid amount'}, 400
+            return None, 'Invalid date format. Use YYYY-MM-DD'
+    else:
+        date = date_type.today()
+
+    return {
+        'expense_name': data['expense_name'],
+        'amount': amount,
+        'payment_method': ExpensePaymentMethod(data['payment_method']),
+        'date': date,
+    }, None
+
 
-        date = data.get('date')
+class ExpenseResource(Resource):
+    method_decorators = {'get': [replica_reads]}
+
+    def get(self, date=None):
         if date:
             try:
-                date = datetime.strptime(date, '%Y-%m-%d').date()
+                target_date = datetime.strptime(date, '%Y-%m-%d').date()
+                etag, last_modified = validators(target_date)
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+
+                serializer = serializer_for(Expense)
+                rows = db.session.execute(
+                    select(*serializer.columns).where(Expense.date == target_date)
+                )
+                return serializer.many(rows), 200, validator_headers(etag, last_modified)
             except ValueError:
                 return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
         else:
-            from datetime import date
-            date = date.today()
+            options, error = parse_listing_args(request.args)
+            if error:
+                return {'error': error}, 400
+            return list_rows(Expense, options)
 
-        expense = Expense(
-            expense_name=data['expense_name'],
-            amount=amount,
-            payment_method=ExpensePaymentMethod(data['payment_method']),
-            date=date
-        )
+    def post(self):
+        data = request.get_json()
+
+        fields, error = validate_expense(data)
+        if error:
+            return {'error': error}, 400
+
+        expense = Expense(**fields)
 
         try:
             db.session.add(expense)
+            DailySummary.apply_expense(expense.date, expense.amount)
             db.session.commit()
-            return expense.to_dict(), 201
+            return serializer_for(Expense).to_dict(expense), 201
+        except DayClosedError as exc:
+            db.session.rollback()
+            return {'error': str(exc)}, 409
         except Exception:
             db.session.rollback()
             return {'error': 'Failed to save expense'}, 500
         
     def patch(self, expense_id):
         data = request.get_json()
-        expense = Expense.query.get(expense_id)
+        # Locked, so concurrent edits can't both take out the same previous values
+        expense = db.session.get(Expense, expense_id, with_for_update=True)
 
         if not expense:
             return {'error': 'Expense not found'}, 404
 
+        previous = (expense.date, expense.amount)
+
         if 'expense_name' in data:
             expense.expense_name = data['expense_name']
 
@@ -91,21 +127,42 @@ class ExpenseResource(Resource):
                 return {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400
 
         try:
+            # Moves between dates: take the old values out, add the new ones
+            if expense.date != previous[0]:
+                DailySummary.lock_days(previous[0], expense.date)
+            DailySummary.apply_expense(*previous, sign=-1)
+            DailySummary.apply_expense(expense.date, expense.amount)
             db.session.commit()
-            return expense.to_dict(), 200
+            return serializer_for(Expense).to_dict(expense), 200
+        except DayClosedError as exc:
+            db.session.rollback()
+            return {'error': str(exc)}, 409
         except Exception:
             db.session.rollback()
             return {'error': 'Failed to update expense'}, 500
         
     def delete(self, expense_id):
-        expense = Expense.query.get(expense_id)
+        expense = db.session.get(Expense, expense_id, with_for_update=True)
         if not expense:
             return {'error': 'Expense not found'}, 404
 
         try:
             db.session.delete(expense)
+            DailySummary.apply_expense(expense.date, expense.amount, sign=-1)
             db.session.commit()
             return {'message': 'Expense deleted successfully'}, 200
+        except DayClosedError as exc:
+            db.session.rollback()
+            return {'error': str(exc)}, 409
         except Exception:
             db.session.rollback()
-            return {'error': 'Failed to delete expense'}, 500
\ No newline at end of file
+            return {'error': 'Failed to delete expense'}, 500
+
+
+class ExpenseBulkResource(Resource):
+    def post(self):
+        rows, error = read_bulk_rows()
+        if error:
+            return {'error': error}, 400
+
+        return bulk_insert(Expense, rows, validate_expense, DailySummary.apply_expense_batch)
@@ -0,0 +1,115 @@
+# exports.py
+import csv
+import io
+import zlib
+from datetime import datetime
+from flask import Response, request, stream_with_context
+from flask_restful import Resource
+from sqlalchemy import select
+from models import db, Collection, Expense, PaymentMethod, ExpensePaymentMethod
+from replica import replica_reads
+from serializers import serializer_for
+from .listing import STREAM_BATCH_SIZE
+
+# Export name -> (model, payment method enum)
+EXPORTS = {
+    'collections': (Collection, PaymentMethod),
+    'expenses': (Expense, ExpensePaymentMethod),
+}
+# Rows written to the CSV buffer before it is handed to the response
+CHUNK_ROWS = 500
+
+
+def parse_export_args(args, methods):
+    """Parse start/end (YYYY-MM-DD) and payment_method (comma-separated).
+
+    Returns (options, error).
+    """
+    options = {'start': None, 'end': None, 'payment_methods': None}
+    for key in ('start', 'end'):
+        if args.get(key):
+            try:
+                options[key] = datetime.strptime(args[key], '%Y-%m-%d').date()
+            except ValueError:
+                return None, f'Invalid {key} date format. Use YYYY-MM-DD'
+
+    if args.get('payment_method'):
+        names = [name.strip().upper() for name in args['payment_method'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in methods.__members__]
+        if unknown:
+            valid = ', '.join(methods.__members__)
+            return None, f'Invalid payment_method {", ".join(unknown)}. Use {valid}'
+        options['payment_methods'] = [methods[name] for name in names]
+    return options, None
+
+
+def csv_chunks(serializer, rows):
+    """Encode rows as CSV, yielding UTF-8 bytes every CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(serializer.keys)
+    row_to_dict = serializer.row_to_dict
+    pending = 0
+    for row in rows:
+        writer.writerow(row_to_dict(row).values())
+        pending += 1
+        if pending == CHUNK_ROWS:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+    """Gzip a byte stream incrementally.
+
+    The first chunk is sync-flushed so the client gets the header row at
+    once; after that zlib emits output as its buffer fills.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    flush = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if flush:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            flush = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ExportResource(Resource):
+    method_decorators = {'get': [replica_reads]}
+
+    def get(self, kind):
+        """Stream every matching row as CSV, gzipped when the client accepts it"""
+        if kind not in EXPORTS:
+            return {"error": f"Unknown export. Use {', '.join(name + '.csv' for name in EXPORTS)}"}, 404
+        model, methods = EXPORTS[kind]
+        options, error = parse_export_args(request.args, methods)
+        if error:
+            return {"error": error}, 400
+
+        serializer = serializer_for(model)
+        statement = select(*serializer.columns)
+        if options['start']:
+            statement = statement.where(model.date >= options['start'])
+        if options['end']:
+            statement = statement.where(model.date <= options['end'])
+        if options['payment_methods']:
+            statement = statement.where(model.payment_method.in_(options['payment_methods']))
+        statement = statement.order_by(model.date, model.id)
+
+        # yield_per fetches in batches (a server-side cursor on Postgres), so
+        # memory stays flat however many years are exported
+        rows = db.session.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+        body = csv_chunks(serializer, rows)
+
+        span = '_'.join(day.isoformat() for day in (options['start'], options['end']) if day)
+        filename = f"{kind}_{span}.csv" if span else f"{kind}.csv"
+        headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+        if request.accept_encodings['gzip'] and request.args.get('gzip') != '0':
+            body = gzip_chunks(body)
+            headers["Content-Encoding"] = "gzip"
+        return Response(stream_with_context(body), mimetype="text/csv", headers=headers)
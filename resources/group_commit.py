@@ -0,0 +1,108 @@
+# group_commit.py
+import threading
+import time
+from flask import current_app
+from models import db, DayClosedError
+from serializers import serializer_for
+
+DEFAULTS = {
+    "GROUP_COMMIT_COLLECTIONS": False,  # opt in: route POST /collections through the batcher
+    "GROUP_COMMIT_MAX_ROWS": 50,        # a batch is flushed once it holds this many rows...
+    "GROUP_COMMIT_MAX_WAIT_MS": 5,      # ...or this long after its first row arrived
+}
+
+
+class _Batch:
+    __slots__ = ("items", "closed", "done")
+
+    def __init__(self):
+        self.items = []
+        self.closed = False
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    """Coalesces concurrent single-row inserts into one transaction.
+
+    The first request to arrive opens a batch and becomes its leader. It
+    waits up to GROUP_COMMIT_MAX_WAIT_MS, or until the batch holds
+    GROUP_COMMIT_MAX_ROWS rows, then writes every row in the batch and the
+    rollup update in one transaction on its own session. Requests that join
+    an open batch block until the leader is done and return their own row.
+    Nothing runs in the background, so a batch can only ever hold requests
+    that are in flight at the same time (threaded workers).
+
+    If the batch transaction fails, each row is retried in its own
+    transaction, so only the rows that are at fault get an error.
+    """
+
+    def __init__(self, model, apply_rollup, error_message):
+        self.model = model
+        self.apply_rollup = apply_rollup
+        self.error_message = error_message
+        self.cond = threading.Condition()
+        self.batch = None
+
+    def submit(self, fields):
+        """Insert one row's column values; returns (body, status) for the caller"""
+        config = current_app.config
+        max_rows = config.get("GROUP_COMMIT_MAX_ROWS", DEFAULTS["GROUP_COMMIT_MAX_ROWS"])
+        max_wait = config.get("GROUP_COMMIT_MAX_WAIT_MS", DEFAULTS["GROUP_COMMIT_MAX_WAIT_MS"]) / 1000
+        item = {"fields": fields, "result": ({"error": self.error_message}, 500)}
+
+        with self.cond:
+            batch = self.batch
+            leader = batch is None
+            if leader:
+                batch = self.batch = _Batch()
+            batch.items.append(item)
+            if len(batch.items) >= max_rows:
+                # Full: later arrivals start a new batch, and the leader stops waiting
+                batch.closed = True
+                self.batch = None
+                self.cond.notify_all()
+
+            if leader:
+                deadline = time.monotonic() + max_wait
+                while not batch.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                if not batch.closed:
+                    batch.closed = True
+                    self.batch = None
+
+        if not leader:
+            batch.done.wait()
+            return item["result"]
+        try:
+            self._write(batch.items)
+        finally:
+            batch.done.set()
+        return item["result"]
+
+    def _write(self, items):
+        """Insert a closed batch in one transaction, falling back to one row at a time"""
+        serializer = serializer_for(self.model)
+        try:
+            objects = [self.model(**item["fields"]) for item in items]
+            db.session.add_all(objects)
+            self.apply_rollup([item["fields"] for item in items])
+            # Serialize after the flush assigns ids, before the commit expires them
+            db.session.flush()
+            bodies = [serializer.to_dict(obj) for obj in objects]
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            if len(items) == 1:
+                if isinstance(exc, DayClosedError):
+                    items[0]["result"] = ({"error": str(exc)}, 409)
+                else:
+                    items[0]["result"] = ({"error": self.error_message}, 500)
+                return
+            for item in items:
+                self._write([item])
+            return
+        for item, body in zip(items, bodies):
+            item["result"] = (body, 201)
@@ -0,0 +1,118 @@
+# listing.py
+from datetime import datetime
+from flask import Response, stream_with_context
+from sqlalchemy import select, tuple_
+from models import db
+from serializers import dumps, serializer_for
+from .conditional import not_modified, validator_headers, validators
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+def parse_listing_args(args):
+    """Parse listing query parameters.
+
+    Returns (options, error). Supported parameters: start/end (YYYY-MM-DD,
+    inclusive), limit, after (cursor from a previous page) and stream
+    (ndjson or json).
+    """
+    options = {'start': None, 'end': None, 'limit': None, 'after': None, 'stream': None}
+
+    for key in ('start', 'end'):
+        if args.get(key):
+            try:
+                options[key] = datetime.strptime(args[key], '%Y-%m-%d').date()
+            except ValueError:
+                return None, f'Invalid {key} date format. Use YYYY-MM-DD'
+
+    if args.get('limit') or args.get('after'):
+        try:
+            options['limit'] = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return None, 'limit must be an integer'
+        if not 1 <= options['limit'] <= MAX_PAGE_SIZE:
+            return None, f'limit must be between 1 and {MAX_PAGE_SIZE}'
+
+    if args.get('after'):
+        try:
+            cursor_date, cursor_id = args['after'].split(':')
+            options['after'] = (datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_id))
+        except ValueError:
+            return None, 'Invalid cursor'
+
+    stream = args.get('stream')
+    if stream:
+        if stream in ('1', 'true', 'ndjson'):
+            options['stream'] = 'ndjson'
+        elif stream == 'json':
+            options['stream'] = 'json'
+        else:
+            return None, 'stream must be ndjson or json'
+
+    return options, None
+
+
+def list_rows(model, options):
+    """Run a listing for model and build the response.
+
+    Without limit/after the filtered rows are returned as a plain list, as
+    before. With them the response is a page ordered by (date, id) with a
+    next_cursor for the following page. stream returns every matching row
+    from a yield_per cursor as NDJSON or a chunked JSON array.
+    """
+    serializer = serializer_for(model)
+    statement = select(*serializer.columns)
+    if options['start']:
+        statement = statement.where(model.date >= options['start'])
+    if options['end']:
+        statement = statement.where(model.date <= options['end'])
+    if options['after']:
+        statement = statement.where(tuple_(model.date, model.id) > tuple_(*options['after']))
+    statement = statement.order_by(model.date, model.id)
+
+    if options['stream']:
+        return _stream(serializer, statement, options['stream'])
+
+    headers = {}
+    if options['start'] and options['end']:
+        # Bounded ranges can be revalidated from the rollup versions
+        etag, last_modified = validators(options['start'], options['end'])
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        headers = validator_headers(etag, last_modified)
+
+    if options['limit'] is None:
+        return serializer.many(db.session.execute(statement)), 200, headers
+
+    items = serializer.many(db.session.execute(statement.limit(options['limit'] + 1)))
+    next_cursor = None
+    if len(items) > options['limit']:
+        items = items[:options['limit']]
+        next_cursor = f"{items[-1]['date']}:{items[-1]['id']}"
+
+    return {'items': items, 'next_cursor': next_cursor}, 200, headers
+
+
+def _stream(serializer, statement, fmt):
+    """Stream query results without materialising the full result set"""
+    rows = db.session.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    row_to_dict = serializer.row_to_dict
+
+    def ndjson():
+        for row in rows:
+            yield dumps(row_to_dict(row)) + b'\n'
+
+    def json_array():
+        yield b'['
+        separator = b''
+        for row in rows:
+            yield separator + dumps(row_to_dict(row))
+            separator = b','
+        yield b']'
+
+    if fmt == 'ndjson':
+        return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(json_array()), mimetype='application/json')
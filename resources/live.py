@@ -0,0 +1,271 @@
+# live.py
+import itertools
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import Response, current_app, request, stream_with_context
+from flask_restful import Resource
+from sqlalchemy import event, inspect, select
+from models import db, Collection, DailySummary, Expense
+from serializers import dumps, serializer_for
+
+DEFAULTS = {
+    "LIVE_KEEPALIVE_SECONDS": 15,  # a comment line is sent this often when nothing changes
+    "LIVE_RESYNC_SECONDS": 30,     # how often a watched day is checked for writes from other processes
+    "LIVE_MAX_SECONDS": 1800,      # streams end after this long; EventSource reconnects by itself
+}
+# Events buffered per stream; a stream further behind skips to the latest totals
+QUEUE_SIZE = 100
+ROW_MODELS = {Collection: "collections", Expense: "expenses"}
+VALUE_COLUMNS = DailySummary.SUM_COLUMNS + DailySummary.COUNT_COLUMNS
+
+
+def sse(name, data, event_id=None):
+    """Encode one Server-Sent Event"""
+    head = f"id: {event_id}\nevent: {name}\n" if event_id is not None else f"event: {name}\n"
+    return head.encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+def totals_event(target_date, version, values):
+    """The totals event for a day's rollup column values"""
+    return sse("totals", {
+        "date": target_date.isoformat(),
+        "version": version,
+        "totals": DailySummary.totals_from_sums(values),
+        "collections_count": values["collections_count"],
+        "expenses_count": values["expenses_count"],
+    }, event_id=version)
+
+
+class _Subscriber:
+    __slots__ = ("queue", "rows", "behind")
+
+    def __init__(self, rows):
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.rows = rows
+        self.behind = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.behind = True
+
+
+class _Day:
+    __slots__ = ("version", "message", "subscribers", "row_subscribers", "checked")
+
+    def __init__(self):
+        self.version = -1
+        self.message = None
+        self.subscribers = set()
+        self.row_subscribers = 0
+        self.checked = time.monotonic()
+
+
+class LiveFeed:
+    """Running totals for the days that have live streams open.
+
+    Writes already keep each day's DailySummary row up to date in their own
+    transaction. After a commit, the row's new values are handed to the
+    feed, which encodes one totals event and queues it for every stream
+    watching that day. Nothing is queried or recomputed per screen, and
+    writes to unwatched days cost a dict lookup.
+
+    The feed only sees commits made in this process. Each watched day is
+    also checked against the database every LIVE_RESYNC_SECONDS, by
+    whichever of its streams gets there first.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.days = {}
+
+    def watched(self, target_date):
+        return target_date in self.days
+
+    def wants_rows(self, target_date):
+        day = self.days.get(target_date)
+        return day is not None and day.row_subscribers > 0
+
+    def subscribe(self, target_date, rows):
+        subscriber = _Subscriber(rows)
+        with self.lock:
+            day = self.days.get(target_date)
+            if day is None:
+                day = self.days[target_date] = _Day()
+            day.subscribers.add(subscriber)
+            day.row_subscribers += rows
+        return subscriber
+
+    def unsubscribe(self, target_date, subscriber):
+        with self.lock:
+            day = self.days.get(target_date)
+            if day is None:
+                return
+            day.subscribers.discard(subscriber)
+            day.row_subscribers -= subscriber.rows
+            if not day.subscribers:
+                del self.days[target_date]
+
+    def latest(self, target_date):
+        """The newest totals event for a watched day"""
+        with self.lock:
+            day = self.days.get(target_date)
+            return day.message if day is not None else None
+
+    def publish(self, target_date, version=None, values=None, rows=None):
+        """Queue a day's new rollup values and/or changed rows for its streams.
+
+        Values older than the ones already sent are dropped, since commits
+        can reach the feed out of order.
+        """
+        with self.lock:
+            day = self.days.get(target_date)
+            if day is None:
+                return
+            if values is not None and version > day.version:
+                day.version = version
+                day.message = totals_event(target_date, version, values)
+                for subscriber in day.subscribers:
+                    subscriber.put(day.message)
+            if rows and day.row_subscribers:
+                message = sse("rows", dict(rows, date=target_date.isoformat()))
+                for subscriber in day.subscribers:
+                    if subscriber.rows:
+                        subscriber.put(message)
+
+    def resync_due(self, target_date, interval):
+        """Claim a day's periodic database check; True for one caller per interval"""
+        with self.lock:
+            day = self.days.get(target_date)
+            if day is None or time.monotonic() - day.checked < interval:
+                return False
+            day.checked = time.monotonic()
+            return True
+
+
+feed = LiveFeed()
+
+
+def load(target_date):
+    """(version, values) of a day's rollup row, read fresh from the database"""
+    columns = [getattr(DailySummary, column) for column in VALUE_COLUMNS]
+    row = db.session.execute(
+        select(DailySummary.version, *columns).where(DailySummary.date == target_date)
+    ).first()
+    # End the transaction so an idle stream doesn't hold a pooled connection
+    db.session.close()
+    if row is None:
+        return 0, dict.fromkeys(VALUE_COLUMNS, 0)
+    return row[0], dict(zip(VALUE_COLUMNS, row[1:]))
+
+
+def _pending(session, target_date):
+    days = session.info.setdefault("live", {})
+    change = days.get(target_date)
+    if change is None:
+        change = days[target_date] = {"totals": None, "rows": {}}
+    return change
+
+
+def _stage_row(session, obj, target_date, removed):
+    if not feed.wants_rows(target_date):
+        return
+    key = ROW_MODELS[type(obj)]
+    rows = _pending(session, target_date)["rows"].setdefault(key, {})
+    rows[obj.id] = None if removed else serializer_for(type(obj)).to_dict(obj)
+
+
+@event.listens_for(db.session, "after_flush")
+def _capture(session, flush_context):
+    """Note the flushed rollup values and rows of watched days until commit"""
+    if not feed.days:
+        return
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, DailySummary):
+            if feed.watched(obj.date):
+                values = {column: getattr(obj, column) for column in VALUE_COLUMNS}
+                _pending(session, obj.date)["totals"] = (obj.version, values)
+        elif type(obj) in ROW_MODELS:
+            # A row moved to another date leaves its old one
+            for old_date in inspect(obj).attrs.date.history.deleted or ():
+                _stage_row(session, obj, old_date, removed=True)
+            _stage_row(session, obj, obj.date, removed=False)
+    for obj in session.deleted:
+        if type(obj) in ROW_MODELS:
+            _stage_row(session, obj, obj.date, removed=True)
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish(session):
+    for target_date, change in session.info.pop("live", {}).items():
+        version, values = change["totals"] or (None, None)
+        rows = {}
+        for key, changed in change["rows"].items():
+            rows[key] = [row for row in changed.values() if row is not None]
+            removed = [row_id for row_id, row in changed.items() if row is None]
+            if removed:
+                rows.setdefault("removed", {})[key] = removed
+        feed.publish(target_date, version, values, rows)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard(session):
+    session.info.pop("live", None)
+
+
+class LiveReportResource(Resource):
+    def get(self, date):
+        """Stream a day's totals as Server-Sent Events.
+
+        A totals event is sent on connect and after every committed change to
+        the day. With ?rows=1, rows events also carry the created or edited
+        collections and expenses and the ids of removed ones. Bulk imports
+        only send totals. Each open stream holds a worker thread.
+        """
+        try:
+            target_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD"}, 400
+        rows = request.args.get("rows") in ("1", "true")
+        config = current_app.config
+        keepalive, resync, lifetime = (
+            config.get(name, DEFAULTS[name])
+            for name in ("LIVE_KEEPALIVE_SECONDS", "LIVE_RESYNC_SECONDS", "LIVE_MAX_SECONDS")
+        )
+
+        # Subscribe before reading, so no commit can fall in between
+        subscriber = feed.subscribe(target_date, rows)
+        try:
+            feed.publish(target_date, *load(target_date))
+        except Exception:
+            feed.unsubscribe(target_date, subscriber)
+            raise
+        if subscriber.queue.empty():
+            # Other streams already had these totals, so they weren't queued
+            subscriber.put(feed.latest(target_date))
+
+        def events():
+            try:
+                yield b"retry: 3000\n\n"
+                deadline = time.monotonic() + lifetime
+                while time.monotonic() < deadline:
+                    if subscriber.behind:
+                        # Dropped events are superseded by the current totals
+                        while not subscriber.queue.empty():
+                            subscriber.queue.get_nowait()
+                        subscriber.behind = False
+                        yield feed.latest(target_date)
+                    try:
+                        yield subscriber.queue.get(timeout=keepalive)
+                    except queue.Empty:
+                        yield b": keepalive\n\n"
+                    if feed.resync_due(target_date, resync):
+                        feed.publish(target_date, *load(target_date))
+            finally:
+                feed.unsubscribe(target_date, subscriber)
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
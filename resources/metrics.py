@@ -0,0 +1,13 @@
+from flask_restful import Resource
+from flask import Response, request
+from instrumentation import metrics
+from .artifact_cache import artifacts
+
+
+class MetricsResource(Resource):
+    def get(self):
+        """Per-route request metrics and artifact cache stats; Prometheus text unless ?format=json"""
+        if request.args.get("format") == "json":
+            return {"routes": metrics.snapshot(), "artifact_cache": artifacts.stats()}, 200
+        return Response(metrics.prometheus() + artifacts.prometheus(),
+                        mimetype="text/plain; version=0.0.4")
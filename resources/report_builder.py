@@ -1,39 +1,76 @@
 # report_builder.py
 from openpyxl import Workbook
-from openpyxl.styles import Font
+from openpyxl.cell import WriteOnlyCell
+import pickle
 from io import BytesIO
+from itertools import chain, islice
+from tempfile import TemporaryFile
+from instrumentation import timed
 from .styles import ExcelStyles
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class DailyReportBuilder:
-    """Builder class for generating formatted daily Excel reports"""
+    """Builder class for generating formatted daily Excel reports
+
+    With write_only=True the sheet is an openpyxl write-only worksheet: rows
+    are serialised as they are appended instead of being kept as cell objects,
+    and stream() hands the finished file out in chunks from a temporary file.
+    """
 
-    def __init__(self, date_str, day_data):
+    def __init__(self, date_str, day_data, write_only=False, workbook=None, sheet_title="Daily Report"):
         self.date_str = date_str
         self.day_data = day_data
-        self.wb = Workbook()
-        self.ws = self.wb.active
-        self.ws.title = "Daily Report"
+        if workbook is not None:
+            # Render as one sheet of a shared (multi-day) workbook
+            self.wb = workbook
+            self.write_only = workbook.write_only
+            self.ws = self.wb.create_sheet(sheet_title)
+        else:
+            self.write_only = write_only
+            self.wb = Workbook(write_only=write_only)
+            if write_only:
+                self.ws = self.wb.create_sheet(sheet_title)
+            else:
+                self.ws = self.wb.active
+                self.ws.title = sheet_title
+        ExcelStyles.register(self.wb)
         self.current_row = 1
+        self.rows_appended = 0
 
     def build(self):
         """Build the complete report"""
+        with timed("render"):
+            self._render()
+            return self._save_to_bytes()
+
+    def save(self, path):
+        """Build the report and write it to a file"""
+        with timed("render"):
+            self._render()
+            self.wb.save(path)
+
+    def stream(self, chunk_size=STREAM_CHUNK_SIZE):
+        """Build the report and return an iterator over the file's bytes"""
+        with timed("render"):
+            self._render()
+            return stream_workbook(self.wb, chunk_size)
+
+    def _render(self):
+        """Write every section of the report"""
+        # Column widths must be set before the first row in write-only mode
+        self._set_column_widths()
         self._add_title()
         self._add_collections_section()
         self._add_expenses_section()
         self._add_totals_section()
-        self._set_column_widths()
-        return self._save_to_bytes()
 
     def _add_title(self):
         """Add report title"""
-        self.ws.merge_cells(f"A{self.current_row}:D{self.current_row}")
-        title_cell = self.ws.cell(row=self.current_row, column=1)
-        title_cell.value = f"Daily Report - {self.date_str}"
-        title_cell.font = Font(name="Calibri", size=14, bold=True)
-        title_cell.alignment = ExcelStyles.CENTER_CENTER
-        self.ws.row_dimensions[self.current_row].height = 25
-        self.current_row += 2
+        self._merge(f"A{self.current_row}:D{self.current_row}")
+        self._write_row({1: (f"Daily Report - {self.date_str}", "title")}, height=25)
+        self.current_row += 1
 
     def _add_collections_section(self):
         """Add collections table"""
@@ -41,10 +78,8 @@ class DailyReportBuilder:
             return
 
         # Section header
-        self.ws.merge_cells(f"A{self.current_row}:E{self.current_row}")
-        section_cell = self.ws.cell(row=self.current_row, column=1, value="COLLECTIONS")
-        ExcelStyles.apply_style(section_cell, ExcelStyles.pattern_4_section())
-        self.current_row += 1
+        self._merge(f"A{self.current_row}:E{self.current_row}")
+        self._write_row({1: ("COLLECTIONS", "pattern_4_section")})
 
         # Table headers
         headers = [
@@ -77,10 +112,8 @@ class DailyReportBuilder:
             return
 
         # Section header
-        self.ws.merge_cells(f"A{self.current_row}:D{self.current_row}")
-        section_cell = self.ws.cell(row=self.current_row, column=1, value="EXPENSES")
-        ExcelStyles.apply_style(section_cell, ExcelStyles.pattern_4_section())
-        self.current_row += 1
+        self._merge(f"A{self.current_row}:D{self.current_row}")
+        self._write_row({1: ("EXPENSES", "pattern_4_section")})
 
         # Table headers
         headers = [
@@ -106,12 +139,8 @@ class DailyReportBuilder:
         self.current_row += 1
 
         # Section header
-        self.ws.merge_cells(f"A{self.current_row}:D{self.current_row}")
-        totals_header = self.ws.cell(
-            row=self.current_row, column=1, value="DAILY TOTALS"
-        )
-        ExcelStyles.apply_style(totals_header, ExcelStyles.pattern_4_section())
-        self.current_row += 1
+        self._merge(f"A{self.current_row}:D{self.current_row}")
+        self._write_row({1: ("DAILY TOTALS", "pattern_4_section")})
 
         totals = self.day_data["totals"]
 
@@ -144,37 +173,55 @@ class DailyReportBuilder:
         # Net total
         self._write_total_row("Net Total", totals["net_total"], bold=True)
 
+    def _write_row(self, cells, height=None):
+        """Write {column: (value, style name)} at the current row and advance"""
+        if height:
+            self.ws.row_dimensions[self.current_row].height = height
+
+        if self.write_only:
+            # Rows can only be appended; pad over any spacer rows first
+            while self.rows_appended < self.current_row - 1:
+                self.ws.append([])
+                self.rows_appended += 1
+            row = [None] * max(cells)
+            for col, (value, style) in cells.items():
+                cell = WriteOnlyCell(self.ws, value=value)
+                cell.style = style
+                row[col - 1] = cell
+            self.ws.append(row)
+            self.rows_appended += 1
+        else:
+            for col, (value, style) in cells.items():
+                cell = self.ws.cell(row=self.current_row, column=col, value=value)
+                cell.style = style
+
+        self.current_row += 1
+
+    def _merge(self, cell_range):
+        """Merge a range of cells in either worksheet mode"""
+        if self.write_only:
+            self.ws.merged_cells.add(cell_range)
+        else:
+            self.ws.merge_cells(cell_range)
+
     def _write_header_row(self, headers):
         """Write a header row with Pattern 1 styling"""
-        for col, header in enumerate(headers, 1):
-            cell = self.ws.cell(row=self.current_row, column=col, value=header)
-            ExcelStyles.apply_style(cell, ExcelStyles.pattern_1_header())
-        self.current_row += 1
+        self._write_row({
+            col: (header, "pattern_1_header")
+            for col, header in enumerate(headers, 1)
+        })
 
     def _write_data_row(self, row_data, amount_col=None):
         """Write a data row with Pattern 3 styling"""
-        for col, value in enumerate(row_data, 1):
-            cell = self.ws.cell(row=self.current_row, column=col, value=value)
-            if col == amount_col:
-                ExcelStyles.apply_style(cell, ExcelStyles.pattern_3_data_right())
-            else:
-                ExcelStyles.apply_style(cell, ExcelStyles.pattern_3_data())
-        self.current_row += 1
+        self._write_row({
+            col: (value, "pattern_3_data_right" if col == amount_col else "pattern_3_data")
+            for col, value in enumerate(row_data, 1)
+        })
 
     def _write_total_row(self, label, value, bold=False):
         """Write a total row with Pattern 5 styling"""
-        label_cell = self.ws.cell(row=self.current_row, column=3, value=label)
-        value_cell = self.ws.cell(row=self.current_row, column=4, value=value)
-
-        if bold:
-            ExcelStyles.apply_style(label_cell, ExcelStyles.pattern_5_totals_bold())
-            ExcelStyles.apply_style(value_cell, ExcelStyles.pattern_5_totals_bold())
-        else:
-            ExcelStyles.apply_style(label_cell, ExcelStyles.pattern_5_totals())
-            ExcelStyles.apply_style(value_cell, ExcelStyles.pattern_5_totals())
-
-        value_cell.alignment = ExcelStyles.RIGHT_CENTER
-        self.current_row += 1
+        style = "pattern_5_totals_bold" if bold else "pattern_5_totals"
+        self._write_row({3: (label, style), 4: (value, f"{style}_right")})
 
     def _set_column_widths(self):
         """Set appropriate column widths"""
@@ -188,3 +235,167 @@ class DailyReportBuilder:
         self.wb.save(bio)
         bio.seek(0)
         return bio
+
+
+class MonthlySummaryBuilder(DailyReportBuilder):
+    """Summary sheet of a monthly workbook: one totals row per active day"""
+
+    COLUMNS = [
+        ("Date", None),
+        ("Cash", "cash_total"),
+        ("Mobile Money", "mobile_money_total"),
+        ("Invoice", "invoice_total"),
+        ("Card", "card_total"),
+        ("Gross Collections", "gross_collections"),
+        ("Total Expenses", "total_expenses"),
+        ("Net Total", "net_total"),
+        ("Cash in Hand", "cash_in_hand"),
+    ]
+
+    def _render(self):
+        """Write the summary table"""
+        self._set_column_widths()
+        self._merge(f"A{self.current_row}:D{self.current_row}")
+        self._write_row({1: (f"Monthly Report - {self.date_str}", "title")}, height=25)
+        self.current_row += 1
+
+        self._write_header_row([label for label, _ in self.COLUMNS])
+        for day in self.day_data["daily_summaries"]:
+            row_data = [day["date"]] + [day["totals"][key] for _, key in self.COLUMNS[1:]]
+            self._write_row({
+                col: (value, "pattern_3_data_right" if col > 1 else "pattern_3_data")
+                for col, value in enumerate(row_data, 1)
+            })
+
+        monthly_totals = self.day_data["monthly_totals"]
+        self.current_row += 1
+        for label, value in (
+            ("Days", monthly_totals["days_count"]),
+            ("Gross Collections", monthly_totals["total_gross_collections"]),
+            ("Total Expenses", monthly_totals["total_expenses"]),
+            ("Net Total", monthly_totals["total_net"]),
+        ):
+            self._write_total_row(label, value, bold=True)
+
+    def _set_column_widths(self):
+        """Set appropriate column widths"""
+        self.ws.column_dimensions["A"].width = 14
+        for col in "BCDEFGHI":
+            self.ws.column_dimensions[col].width = 18
+
+
+class MultiDayReportBuilder:
+    """Builder for a workbook with one daily report sheet per day
+
+    days may be any iterable, such as a generator that loads one day at a
+    time; each day's sheet is written (and, in write-only mode, flushed)
+    before the next day is pulled. An optional month summary from
+    get_month_tallies(include_rows=False) becomes the first sheet.
+    """
+
+    def __init__(self, days, summary=None, write_only=True):
+        self.days = days
+        self.summary = summary
+        self.wb = Workbook(write_only=write_only)
+        if not write_only:
+            self.wb.remove(self.wb.active)
+        ExcelStyles.register(self.wb)
+
+    def build(self):
+        """Build the complete report"""
+        with timed("render"):
+            self._render()
+            bio = BytesIO()
+            self.wb.save(bio)
+        bio.seek(0)
+        return bio
+
+    def save(self, path):
+        """Build the report and write it to a file"""
+        with timed("render"):
+            self._render()
+            self.wb.save(path)
+
+    def stream(self, chunk_size=STREAM_CHUNK_SIZE):
+        """Build the report and return an iterator over the file's bytes"""
+        with timed("render"):
+            self._render()
+            return stream_workbook(self.wb, chunk_size)
+
+    def _render(self):
+        """Write the summary and one sheet per day, or a placeholder when empty"""
+        sheets = 0
+        if self.summary is not None:
+            MonthlySummaryBuilder(
+                self.summary["month"], self.summary, workbook=self.wb, sheet_title="Summary"
+            )._render()
+            sheets += 1
+        for day_data in self.days:
+            DailyReportBuilder(
+                day_data["date"], day_data, workbook=self.wb, sheet_title=day_data["date"]
+            )._render()
+            sheets += 1
+        if not sheets:
+            ws = self.wb.create_sheet("Report")
+            ws.append(["No collections or expenses in this period"])
+
+
+def stream_workbook(wb, chunk_size=STREAM_CHUNK_SIZE):
+    """Save a workbook to a temporary file and return an iterator over its chunks"""
+    tmp = TemporaryFile()
+    try:
+        wb.save(tmp)
+    except Exception:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return _iter_file(tmp, chunk_size)
+
+
+def _iter_file(fileobj, chunk_size):
+    """Yield a file in chunks, closing it once exhausted"""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def spool_days(days, path):
+    """Pickle day_data dicts to a file one at a time; returns how many were written"""
+    count = 0
+    with open(path, "wb") as spool:
+        for day_data in days:
+            pickle.dump(day_data, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            count += 1
+    return count
+
+
+def read_spooled_days(path):
+    """Yield the day_data dicts written by spool_days, one at a time"""
+    with open(path, "rb") as spool:
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                return
+
+
+def write_report_file(days_path, path, summary=None):
+    """Render the day_data dicts spooled in days_path to an xlsx file.
+
+    Entry point for the report job process pool, so it only takes picklable
+    arguments. Days are read from the spool as their sheets are written, so
+    only one is in memory at a time.
+    """
+    days = read_spooled_days(days_path)
+    head = list(islice(days, 2))
+    if len(head) == 1 and summary is None:
+        builder = DailyReportBuilder(head[0]["date"], head[0], write_only=True)
+    else:
+        builder = MultiDayReportBuilder(chain(head, days), summary=summary)
+    builder.save(path)
+    return path
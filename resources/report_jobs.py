@@ -0,0 +1,300 @@
+# report_jobs.py
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from calendar import monthrange
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from flask import current_app, request, send_file
+from flask_restful import Resource
+from sqlalchemy import select
+from models import db, DailySummary, Expense
+from serializers import dumps
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+DEFAULTS = {
+    "REPORT_JOB_PROCESSES": 2,      # rendering processes
+    "REPORT_JOB_MAX_PENDING": 8,    # queued + running jobs before submissions get 429
+    "REPORT_JOB_TTL": 3600,         # seconds a finished job and its artifact are kept
+    "REPORT_JOB_MAX_DAYS": 366,     # longest date range a job may cover
+    "REPORT_JOB_DIR": os.path.join(tempfile.gettempdir(), "report-jobs"),  # shared by all workers
+}
+JOB_ID = re.compile(r"[0-9a-f]{32}\Z")
+
+
+class ReportJobManager:
+    """Runs report jobs off the request thread.
+
+    Data for a job is gathered on a small thread pool (it needs the app and a
+    database session) and spooled to disk one day at a time. xlsx rendering
+    then goes to a bounded process pool, which reads the spool back day by
+    day, so CPU-heavy openpyxl work does not compete with request handling
+    for the GIL and no process holds the whole range in memory.
+
+    Each job's state is kept in a JSON manifest next to its artifact in
+    REPORT_JOB_DIR, so any worker sharing that directory can answer status
+    and artifact requests. REPORT_JOB_MAX_PENDING is counted per worker.
+    Jobs and artifacts expire after a TTL.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.config = None
+        self.threads = None
+        self.processes = None
+
+    def _setup(self, app):
+        """Create the pools from app config on first use"""
+        with self.lock:
+            if self.config is not None:
+                return
+            self.config = {key: app.config.get(key, default) for key, default in DEFAULTS.items()}
+            os.makedirs(self.config["REPORT_JOB_DIR"], exist_ok=True)
+            workers = self.config["REPORT_JOB_PROCESSES"]
+            self.threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+            # spawn: don't fork the web worker's threads and DB connections
+            self.processes = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.config["REPORT_JOB_DIR"], f"{job_id}.{suffix}")
+
+    def submit(self, app, spec):
+        """Queue a job; returns the job dict, or None when at capacity"""
+        self._setup(app)
+        self.cleanup()
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+            if pending >= self.config["REPORT_JOB_MAX_PENDING"]:
+                return None
+            job_id = uuid.uuid4().hex
+            job = self.jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "spec": spec,
+                "created_at": time.time(),
+                "finished_at": None,
+                "error": None,
+                "path": None,
+            }
+        self._save(job)
+        self.threads.submit(self._run, app, job)
+        return job
+
+    def get(self, app, job_id):
+        """A job started by any worker, or None if unknown or expired"""
+        self._setup(app)
+        if not JOB_ID.match(job_id):
+            return None
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            job = self._load(job_id)
+        if job is not None and self._expired(job, time.time() - self.config["REPORT_JOB_TTL"]):
+            return None
+        return job
+
+    def _save(self, job):
+        """Write a job's manifest, replacing the previous one atomically"""
+        spec = job["spec"]
+        manifest = dict(job, spec=dict(spec, start=spec["start"].isoformat(), end=spec["end"].isoformat()))
+        path = self._path(job["id"], "job.json")
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(partial, "w") as f:
+            json.dump(manifest, f)
+        os.replace(partial, path)
+
+    def _load(self, job_id):
+        try:
+            with open(self._path(job_id, "job.json")) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        spec = job["spec"]
+        spec["start"] = date.fromisoformat(spec["start"])
+        spec["end"] = date.fromisoformat(spec["end"])
+        return job
+
+    @staticmethod
+    def _expired(job, cutoff):
+        # A job whose worker died never finishes; it expires a TTL after submission
+        return (job["finished_at"] or job["created_at"]) < cutoff
+
+    def cleanup(self):
+        """Drop jobs older than the TTL and delete their manifests and artifacts"""
+        if self.config is None:
+            return
+        cutoff = time.time() - self.config["REPORT_JOB_TTL"]
+        with self.lock:
+            for job in [job for job in self.jobs.values() if job["finished_at"] is not None]:
+                if self._expired(job, cutoff):
+                    del self.jobs[job["id"]]
+        directory = self.config["REPORT_JOB_DIR"]
+        for name in os.listdir(directory):
+            job_id, _, suffix = name.partition(".")
+            if suffix != "job.json" or job_id in self.jobs:
+                continue
+            job = self._load(job_id)
+            if job is None or not self._expired(job, cutoff):
+                continue
+            for path in (job["path"], self._path(job_id, "job.json")):
+                if path:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _run(self, app, job):
+        job["status"] = "running"
+        self._save(job)
+        spec = job["spec"]
+        path = self._path(job["id"], spec["format"])
+        spool = self._path(job["id"], "days")
+        try:
+            with app.app_context():
+                days = iter_days(spec["start"], spec["end"])
+                if spec["format"] == "xlsx":
+                    from .report_builder import spool_days, write_report_file  # openpyxl is loaded on first use
+                    spool_days(days, spool)
+                    summary = None
+                    if spec["type"] == "month":
+                        summary = Expense.get_month_tallies(
+                            spec["start"].month, spec["start"].year, include_rows=False
+                        )
+                else:
+                    write_json_report(days, spec, path)
+            if spec["format"] == "xlsx":
+                self.processes.submit(write_report_file, spool, path, summary).result()
+            job["path"] = path
+            job["status"] = "done"
+        except Exception as exc:
+            job["status"] = "failed"
+            job["error"] = str(exc) or exc.__class__.__name__
+        finally:
+            if os.path.exists(spool):
+                os.remove(spool)
+            job["finished_at"] = time.time()
+            self._save(job)
+
+
+jobs = ReportJobManager()
+
+
+def iter_days(start_date, end_date):
+    """Day tallies with rows for every day with data in the range, loaded one day at a time"""
+    active_days = db.session.scalars(
+        select(DailySummary.date).where(
+            DailySummary.date.between(start_date, end_date),
+            (DailySummary.collections_count > 0) | (DailySummary.expenses_count > 0)
+        ).order_by(DailySummary.date)
+    ).all()
+    for day in active_days:
+        yield Expense.get_day_tallies(day)
+
+
+def write_json_report(days, spec, path):
+    """Write the days of a json job to path as they are loaded"""
+    with open(path, "wb") as f:
+        f.write(b'{"start":' + dumps(spec["start"].isoformat()) + b',"end":' + dumps(spec["end"].isoformat()) + b',"days":[')
+        for index, day_data in enumerate(days):
+            if index:
+                f.write(b",")
+            f.write(dumps(day_data))
+        f.write(b"]}")
+
+
+def parse_job_spec(data, max_days):
+    """Validate a job submission. Returns (spec, error)."""
+    if not isinstance(data, dict):
+        return None, "Expected a JSON object"
+
+    fmt = data.get("format", "json")
+    if fmt not in ("json", "xlsx"):
+        return None, "format must be json or xlsx"
+
+    kind = data.get("type")
+    try:
+        if kind == "day":
+            start = end = datetime.strptime(data["date"], "%Y-%m-%d").date()
+        elif kind == "month":
+            year, month = map(int, data["month"].split("-"))
+            start = date(year, month, 1)
+            end = date(year, month, monthrange(year, month)[1])
+        elif kind == "range":
+            start = datetime.strptime(data["start"], "%Y-%m-%d").date()
+            end = datetime.strptime(data["end"], "%Y-%m-%d").date()
+        else:
+            return None, "type must be day, month or range"
+    except (KeyError, TypeError, ValueError):
+        return None, "Invalid date. Use date=YYYY-MM-DD, month=YYYY-MM or start/end=YYYY-MM-DD"
+
+    if end < start:
+        return None, "end must not be before start"
+    if end - start >= timedelta(days=max_days):
+        return None, f"Date range is limited to {max_days} days"
+
+    return {"type": kind, "start": start, "end": end, "format": fmt}, None
+
+
+def job_status(job):
+    """Public view of a job"""
+    spec = job["spec"]
+    status = {
+        "id": job["id"],
+        "status": job["status"],
+        "type": spec["type"],
+        "start": spec["start"].isoformat(),
+        "end": spec["end"].isoformat(),
+        "format": spec["format"],
+        "error": job["error"],
+    }
+    if job["status"] == "done":
+        status["artifact_url"] = f"/reports/jobs/{job['id']}/artifact"
+    return status
+
+
+class ReportJobsResource(Resource):
+    def post(self):
+        max_days = current_app.config.get("REPORT_JOB_MAX_DAYS", DEFAULTS["REPORT_JOB_MAX_DAYS"])
+        spec, error = parse_job_spec(request.get_json(silent=True), max_days)
+        if error:
+            return {"error": error}, 400
+
+        job = jobs.submit(current_app._get_current_object(), spec)
+        if job is None:
+            return {"error": "Too many report jobs in progress. Try again later"}, 429
+        return job_status(job), 202, {"Location": f"/reports/jobs/{job['id']}"}
+
+
+class ReportJobResource(Resource):
+    def get(self, job_id):
+        job = jobs.get(current_app._get_current_object(), job_id)
+        if not job:
+            return {"error": "Report job not found"}, 404
+        return job_status(job), 200
+
+
+class ReportJobArtifactResource(Resource):
+    def get(self, job_id):
+        job = jobs.get(current_app._get_current_object(), job_id)
+        if not job:
+            return {"error": "Report job not found"}, 404
+        if job["status"] != "done":
+            return {"error": f"Report job is {job['status']}"}, 409
+
+        spec = job["spec"]
+        name = f"report_{spec['start'].isoformat()}_{spec['end'].isoformat()}.{spec['format']}"
+        return send_file(
+            job["path"],
+            as_attachment=True,
+            download_name=name,
+            mimetype=XLSX_MIMETYPE if spec["format"] == "xlsx" else "application/json",
+        )
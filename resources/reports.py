@@ -1,35 +1,111 @@
 from flask_restful import Resource
-from flask import send_file
-from models import Expense
-from datetime import datetime
-from .report_builder import DailyReportBuilder
+from flask import Response, send_file, request, stream_with_context
+from sqlalchemy.orm import defer
+from models import db, DailyBalance, DailySummary, DaySnapshot, Expense, RANGE_BUCKETS
+from replica import replica_reads
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from .artifact_cache import artifacts, tee
+from .conditional import (
+    not_modified, snapshot_validators, snapshot_version, validator_headers, validators,
+    versioned_validators, with_validators
+)
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
 class ReportResource(Resource):
-    def get(self, type, param):
+    method_decorators = {"get": [replica_reads]}
+    # Per-type metrics series are labelled from this list
+    REPORT_TYPES = ("day", "daily", "monthly", "monthly-xlsx", "range", "balance")
+
+    def get(self, type, param, end=None):
+        if end is not None and type not in ("range", "balance"):
+            return {"error": "Only range and balance reports take an end date"}, 400
+
         if type == "day":
             try:
                 target_date = datetime.strptime(param, "%Y-%m-%d").date()
-                day_data = Expense.get_day_tallies(target_date)
-                return day_data, 200
+                totals_only = request.args.get("totals_only") in ("1", "true")
+
+                # Closed days are served as stored
+                snapshot = db.session.get(DaySnapshot, target_date, options=[defer(DaySnapshot.xlsx)])
+                if snapshot is not None:
+                    etag, last_modified = snapshot_validators(snapshot)
+                    cached = not_modified(etag, last_modified)
+                    if cached:
+                        return cached
+                    if totals_only:
+                        day_data = {"date": param, "totals": snapshot.totals}
+                        return day_data, 200, validator_headers(etag, last_modified)
+                    response = Response(snapshot.payload, mimetype="application/json")
+                    return with_validators(response, etag, last_modified)
+
+                etag, last_modified = validators(target_date)
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+
+                day_data = Expense.get_day_tallies(
+                    target_date, include_rows=not totals_only
+                )
+                return day_data, 200, validator_headers(etag, last_modified)
             except ValueError:
                 return {"error": "Invalid date format. Use YYYY-MM-DD"}, 400
 
         elif type == "daily":
             try:
                 target_date = datetime.strptime(param, "%Y-%m-%d").date()
-                day_data = Expense.get_day_tallies(target_date)
+                filename = f"daily_report_{param}.xlsx"
+
+                snapshot = db.session.get(DaySnapshot, target_date, options=[defer(DaySnapshot.payload)])
+                if snapshot is not None:
+                    version, updated_at = snapshot_version(snapshot)
+                else:
+                    version, updated_at = DailySummary.data_version(target_date, target_date)
+                etag, last_modified = versioned_validators(version, updated_at)
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+
+                key = ("daily", target_date, target_date, version)
+                stored = snapshot.xlsx if snapshot is not None else None
+                if stored is None:
+                    stored = artifacts.get(key)
+                if stored is not None:
+                    response = Response(
+                        stored,
+                        mimetype=XLSX_MIMETYPE,
+                        headers={"Content-Disposition": f"attachment; filename={filename}"},
+                    )
+                    return with_validators(response, etag, last_modified)
+                if snapshot is not None:
+                    day_data = snapshot.day_data()
+                else:
+                    day_data = Expense.get_day_tallies(target_date)
+
+                # Use builder to generate Excel; openpyxl is loaded on first use
+                from .report_builder import DailyReportBuilder
+                if request.args.get("stream") in ("1", "true"):
+                    builder = DailyReportBuilder(param, day_data, write_only=True)
+                    response = Response(
+                        stream_with_context(tee(key, builder.stream())),
+                        mimetype=XLSX_MIMETYPE,
+                        headers={"Content-Disposition": f"attachment; filename={filename}"},
+                    )
+                    return with_validators(response, etag, last_modified)
 
-                # Use builder to generate Excel
                 builder = DailyReportBuilder(param, day_data)
                 excel_file = builder.build()
+                artifacts.put(key, excel_file.getvalue())
 
-                return send_file(
+                response = send_file(
                     excel_file,
                     as_attachment=True,
-                    download_name=f"daily_report_{param}.xlsx",
-                    mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    download_name=filename,
+                    mimetype=XLSX_MIMETYPE,
                 )
+                return with_validators(response, etag, last_modified)
 
             except ValueError:
                 return {"error": "Invalid date format. Use YYYY-MM-DD"}, 400
@@ -37,9 +113,115 @@ class ReportResource(Resource):
         elif type == "monthly":
             try:
                 year, month_num = map(int, param.split("-"))
-                month_data = Expense.get_month_tallies(month_num, year)
-                return month_data, 200
+                _, last_day = monthrange(year, month_num)
+                etag, last_modified = validators(
+                    date(year, month_num, 1), date(year, month_num, last_day)
+                )
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+
+                totals_only = request.args.get("totals_only") in ("1", "true")
+                # A fully closed month is a plain read of its snapshots
+                month_data = DaySnapshot.month_tallies(
+                    month_num, year, include_rows=not totals_only
+                ) or Expense.get_month_tallies(month_num, year, include_rows=not totals_only)
+                return month_data, 200, validator_headers(etag, last_modified)
+            except ValueError:
+                return {"error": "Invalid month format. Use YYYY-MM"}, 400
+
+        elif type == "monthly-xlsx":
+            try:
+                year, month_num = map(int, param.split("-"))
+                _, last_day = monthrange(year, month_num)
+                start_date, end_date = date(year, month_num, 1), date(year, month_num, last_day)
+                version, updated_at = DailySummary.data_version(start_date, end_date)
+                etag, last_modified = versioned_validators(version, updated_at)
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+
+                filename = f"monthly_report_{param}.xlsx"
+                key = ("monthly-xlsx", start_date, end_date, version)
+                stored = artifacts.get(key)
+                if stored is not None:
+                    response = Response(
+                        stored,
+                        mimetype=XLSX_MIMETYPE,
+                        headers={"Content-Disposition": f"attachment; filename={filename}"},
+                    )
+                    return with_validators(response, etag, last_modified)
+
+                # Rows are loaded one day at a time as each sheet is written
+                month_data = DaySnapshot.month_tallies(month_num, year, include_rows=False)
+                if month_data is not None:
+                    days = (
+                        DaySnapshot.day_data_for(day_date) or Expense.get_day_tallies(day_date)
+                        for day_date in (date.fromisoformat(day["date"]) for day in month_data["daily_summaries"])
+                    )
+                else:
+                    month_data = Expense.get_month_tallies(month_num, year, include_rows=False)
+                    days = (
+                        Expense.get_day_tallies(date.fromisoformat(day["date"]))
+                        for day in month_data["daily_summaries"]
+                    )
+                from .report_builder import MultiDayReportBuilder
+                builder = MultiDayReportBuilder(days, summary=month_data)
+                response = Response(
+                    stream_with_context(tee(key, builder.stream())),
+                    mimetype=XLSX_MIMETYPE,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"},
+                )
+                return with_validators(response, etag, last_modified)
             except ValueError:
                 return {"error": "Invalid month format. Use YYYY-MM"}, 400
+
+        elif type == "range":
+            try:
+                start_date = datetime.strptime(param, "%Y-%m-%d").date()
+                end_date = datetime.strptime(end or "", "%Y-%m-%d").date()
+            except ValueError:
+                return {"error": "Invalid date format. Use /reports/range/YYYY-MM-DD/YYYY-MM-DD"}, 400
+            if end_date < start_date:
+                return {"error": "end must not be before start"}, 400
+
+            bucket = request.args.get("bucket", "day")
+            if bucket not in RANGE_BUCKETS:
+                return {"error": "bucket must be day, week, month or year"}, 400
+
+            etag, last_modified = validators(start_date, end_date)
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
+
+            range_data = Expense.get_range_tallies(start_date, end_date, bucket)
+            return range_data, 200, validator_headers(etag, last_modified)
+
+        elif type == "balance":
+            try:
+                start_date = datetime.strptime(param, "%Y-%m-%d").date()
+                end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+            except ValueError:
+                return {"error": "Invalid date format. Use /reports/balance/YYYY-MM-DD[/YYYY-MM-DD]"}, 400
+            if end_date is None:
+                # Everything up to and including the date
+                totals = DailySummary.totals_from_sums(DailyBalance.as_of(start_date))
+                return {"date": param, "balance": round(totals["cash_in_hand"], 2), "totals": totals}, 200
+            if end_date < start_date:
+                return {"error": "end must not be before start"}, 400
+
+            opening = DailyBalance.as_of(start_date - timedelta(days=1))
+            closing = DailyBalance.as_of(end_date)
+            movement = {column: round(closing[column] - opening[column], 2) for column in closing}
+            opening_balance = round(DailySummary.totals_from_sums(opening)["cash_in_hand"], 2)
+            closing_balance = round(DailySummary.totals_from_sums(closing)["cash_in_hand"], 2)
+            return {
+                "start": param,
+                "end": end,
+                "opening_balance": opening_balance,
+                "closing_balance": closing_balance,
+                "movement": round(closing_balance - opening_balance, 2),
+                "totals": DailySummary.totals_from_sums(movement),
+            }, 200
         else:
-            return {"error": "Invalid type. Use day, daily, or monthly"}, 400
\ No newline at end of file
+            return {"error": f"Invalid type. Use {', '.join(self.REPORT_TYPES[:-1])} or {self.REPORT_TYPES[-1]}"}, 400
\ No newline at end of file
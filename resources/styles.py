@@ -1,9 +1,13 @@
 # styles.py
-from openpyxl.styles import Font, Border, Side, Alignment
+from openpyxl.styles import Font, Border, Side, Alignment, NamedStyle
 
 
 class ExcelStyles:
-    """Centralized style definitions"""
+    """Centralized style definitions
+
+    Patterns are registered once per workbook as named styles (see register),
+    so writing a styled cell is a single ``cell.style = name`` assignment.
+    """
 
     # Border definitions
     THIN = Side(border_style="thin", color="000000")
@@ -14,6 +18,28 @@ class ExcelStyles:
     CENTER_CENTER = Alignment(horizontal="center", vertical="center")
     RIGHT_CENTER = Alignment(horizontal="right", vertical="center")
 
+    # Patterns registered as named styles, by method name
+    NAMED_PATTERNS = (
+        "title",
+        "pattern_1_header",
+        "pattern_2_plain",
+        "pattern_3_data",
+        "pattern_3_data_right",
+        "pattern_4_section",
+        "pattern_5_totals",
+        "pattern_5_totals_bold",
+        "pattern_5_totals_right",
+        "pattern_5_totals_bold_right",
+    )
+
+    @staticmethod
+    def title():
+        """Large Bold, Centered (Report Title)"""
+        return {
+            "font": Font(name="Calibri", size=14, bold=True),
+            "alignment": ExcelStyles.CENTER_CENTER,
+        }
+
     @staticmethod
     def pattern_1_header():
         """Bold + Full Border (Table Headers)"""
@@ -88,8 +114,34 @@ class ExcelStyles:
         style["font"] = Font(name="Calibri", size=13, bold=True)
         return style
 
+    @staticmethod
+    def pattern_5_totals_right():
+        """Totals value cell with right alignment"""
+        style = ExcelStyles.pattern_5_totals()
+        style["alignment"] = ExcelStyles.RIGHT_CENTER
+        return style
+
+    @staticmethod
+    def pattern_5_totals_bold_right():
+        """Bold totals value cell with right alignment"""
+        style = ExcelStyles.pattern_5_totals_bold()
+        style["alignment"] = ExcelStyles.RIGHT_CENTER
+        return style
+
+    @staticmethod
+    def register(wb):
+        """Add every pattern to a workbook as a NamedStyle, skipping existing ones"""
+        existing = set(wb.named_styles)
+        for name in ExcelStyles.NAMED_PATTERNS:
+            if name in existing:
+                continue
+            named_style = NamedStyle(name=name)
+            ExcelStyles.apply_style(named_style, getattr(ExcelStyles, name)())
+            wb.add_named_style(named_style)
+
     @staticmethod
     def apply_style(cell, style_dict):
         """Apply a style dictionary to a cell"""
         for attr, value in style_dict.items():
             setattr(cell, attr, value)
+
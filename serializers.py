@@ -0,0 +1,89 @@
+"""Precompiled serializers for hot paths.
+
+SerializerMixin.to_dict() introspects the model on every call. A
+ModelSerializer is built once per model from its column list into a plain
+function, and can serialize either ORM instances or the row tuples returned
+by a Core select over ``serializer.columns``, skipping ORM hydration.
+Output matches to_dict(): enums become their value, dates use the mixin's
+default formats.
+"""
+import json
+from operator import attrgetter
+from sqlalchemy import Date, DateTime, Enum, Time
+from instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIME_FORMAT = "%H:%M"
+
+
+def _converter(column_type):
+    """Expression template converting a non-None value of this type, or None"""
+    if isinstance(column_type, Enum):
+        return "{}.value"
+    if isinstance(column_type, DateTime):
+        return f"{{}}.strftime({DATETIME_FORMAT!r})"
+    if isinstance(column_type, Date):
+        return f"{{}}.strftime({DATE_FORMAT!r})"
+    if isinstance(column_type, Time):
+        return f"{{}}.strftime({TIME_FORMAT!r})"
+    return None
+
+
+class ModelSerializer:
+    """Serializer compiled once from a model's column list"""
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = tuple(model.__table__.columns)
+        self.keys = tuple(column.key for column in self.columns)
+        self._values = attrgetter(*self.keys)
+        self.row_to_dict = self._compile()
+
+    def _compile(self):
+        """Build a function mapping a row tuple to a dict"""
+        items = []
+        for index, column in enumerate(self.columns):
+            value = f"row[{index}]"
+            template = _converter(column.type)
+            if template:
+                value = f"(None if {value} is None else {template.format(value)})"
+            items.append(f"{column.key!r}: {value}")
+
+        source = "def row_to_dict(row):\n    return {" + ", ".join(items) + "}\n"
+        namespace = {}
+        exec(compile(source, f"<serializer {self.model.__name__}>", "exec"), namespace)
+        return namespace["row_to_dict"]
+
+    def to_dict(self, instance):
+        """Serialize an ORM instance"""
+        return self.row_to_dict(self._values(instance))
+
+    def many(self, rows):
+        """Serialize an iterable of row tuples"""
+        row_to_dict = self.row_to_dict
+        with timed("serialize"):
+            return [row_to_dict(row) for row in rows]
+
+
+_serializers = {}
+
+
+def serializer_for(model):
+    """The cached ModelSerializer for a model"""
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers[model] = ModelSerializer(model)
+    return serializer
+
+
+def dumps(data):
+    """Encode JSON to bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
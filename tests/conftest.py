@@ -0,0 +1,45 @@
+import os
+from datetime import date
+
+import pytest
+
+# app.py builds its module-level app from DATABASE_URL on import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """A scratch SQLite database, or TEST_DATABASE_URL to run against Postgres"""
+    return os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def app(database_url):
+    from app import create_app
+    from models import db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Test client over empty tables"""
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded_client(client, app):
+    """Test client over a synthetic March 2024"""
+    from benchmarks.synthetic import generate
+
+    with app.app_context():
+        generate(start=date(2024, 3, 1), days=31, rows_per_day=5, expenses_per_day=2)
+    return client
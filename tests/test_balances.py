@@ -0,0 +1,46 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+
+def expense(day, amount):
+    return {"expense_name": "Supplies", "amount": amount, "payment_method": "CASH",
+            "date": day.isoformat()}
+
+
+def collection(day, amount, method):
+    return {"card_no": "1", "procedure": "Filling", "payment_method": method,
+            "amount": amount, "doctor": "Dr. A", "date": day.isoformat()}
+
+
+def test_backdated_writes_keep_running_totals_exact(app, client):
+    from models import DailyBalance, DailySummary
+
+    rng = random.Random(7)
+    start = date(2024, 1, 1)
+    days = [start + timedelta(days=offset) for offset in range(0, 120, 3)]
+    # Bulk imports across many new and existing days, out of order
+    for _ in range(3):
+        picked = rng.sample(days, 25)
+        response = client.post("/collections/bulk", json=[
+            collection(day, rng.randint(100, 900) / 4, rng.choice(["CASH", "MPESA", "TILL"]))
+            for day in picked
+        ])
+        assert response.status_code == 201, response.get_json()
+        response = client.post("/expenses/bulk", json=[expense(day, rng.randint(1, 50)) for day in picked[:10]])
+        assert response.status_code == 201, response.get_json()
+    # Single writes that move rows back and forth between days
+    ids = [client.post("/collections", json=collection(day, 250, "CASH")).get_json()["id"] for day in days[::7]]
+    for collection_id, day in zip(ids, reversed(days[::7])):
+        assert client.patch(f"/collections/{collection_id}", json={"date": (day - timedelta(days=1)).isoformat()}).status_code == 200
+    assert client.delete(f"/collections/{ids[0]}").status_code == 200
+
+    with app.app_context():
+        assert DailySummary.verify() == []
+        assert DailyBalance.verify() == []
+        for target in (start - timedelta(days=1), days[10], days[-1] + timedelta(days=30)):
+            sums = DailySummary.empty_sums()
+            for summary in DailySummary.query.filter(DailySummary.date <= target):
+                summary.add_to(sums)
+            assert DailyBalance.as_of(target) == pytest.approx(sums, abs=0.005)
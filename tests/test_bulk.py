@@ -0,0 +1,24 @@
+import io
+
+CSV = "expense_name,amount,payment_method,date\nCafé supplies,10,CASH,2024-01-01\n"
+
+
+def upload(client, data):
+    return client.post("/expenses/bulk", data={"file": (io.BytesIO(data), "expenses.csv")},
+                       content_type="multipart/form-data")
+
+
+def test_csv_upload(client):
+    response = upload(client, CSV.encode("utf-8-sig"))
+    assert response.status_code == 201
+    assert response.get_json()["inserted"] == 1
+
+
+def test_bad_uploads_are_json_400s(client):
+    for response in (
+        upload(client, CSV.encode("cp1252")),
+        client.post("/expenses/bulk", data=CSV.encode("cp1252"), content_type="text/csv"),
+        client.post("/expenses/bulk", data={"rows": "1"}, content_type="multipart/form-data"),
+    ):
+        assert response.status_code == 400
+        assert "error" in response.get_json()
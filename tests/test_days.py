@@ -0,0 +1,35 @@
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+
+def sheets(response):
+    assert response.status_code == 200
+    workbook = load_workbook(BytesIO(response.data))
+    return {ws.title: [row for row in ws.iter_rows(values_only=True)] for ws in workbook}
+
+
+def test_action_routes_only_take_post(client):
+    assert client.get("/days/2024-03-01/close").status_code == 405
+    assert client.post("/days/2024-03-01").status_code == 405
+    assert client.post("/days/2024-03-01/archive").status_code == 400
+    assert client.post("/days/2024-03-01/close").get_json()["closed"] is True
+    assert client.get("/days/2024-03-01").get_json()["closed"] is True
+
+
+def test_closed_month_workbook_matches_open_month(seeded_client, monkeypatch):
+    from models import DaySnapshot
+
+    open_month = sheets(seeded_client.get("/reports/monthly-xlsx/2024-03"))
+    for day in range(1, 32):
+        seeded_client.post(f"/days/2024-03-{day:02d}/close")
+    # Closed days' rows come from their snapshots, one payload at a time
+    loaded = []
+    day_data_for = DaySnapshot.day_data_for
+    monkeypatch.setattr(DaySnapshot, "day_data_for", lambda day: loaded.append(day) or day_data_for(day))
+    closed_month = sheets(seeded_client.get("/reports/monthly-xlsx/2024-03"))
+
+    assert len(loaded) == 31
+    assert len(closed_month) == 32
+    assert closed_month == open_month
@@ -0,0 +1,18 @@
+from instrumentation import metrics
+
+
+def test_report_errors_are_counted_per_type(client, monkeypatch):
+    from models import Expense
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("render failed")
+
+    metrics.reset()
+    monkeypatch.setattr(Expense, "get_day_tallies", fail)
+    client.application.config["PROPAGATE_EXCEPTIONS"] = False
+    for url in ("/reports/day/2024-01-01", "/reports/day/not-a-date", "/reports/nope/2024-01-01"):
+        client.get(url).close()
+
+    assert metrics.routes["ReportResource:day"]["count"] == 2
+    assert metrics.routes["ReportResource:day"]["errors"] == 1
+    assert metrics.routes["ReportResource:invalid"]["count"] == 1
@@ -0,0 +1,50 @@
+import os
+from datetime import date
+
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import Enum, func, insert, select, text
+from sqlalchemy.schema import CreateTable
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+
+def test_upgrade_backfills_rollup_and_running_totals(app):
+    from models import db, Collection, DailyBalance, DailySummary, Expense
+
+    Migrate(app, db, directory=MIGRATIONS)
+    with app.app_context():
+        # The schema the first revision starts from: the base tables, unindexed
+        for table in (Collection.__table__, Expense.__table__):
+            for column in table.columns:
+                if isinstance(column.type, Enum):
+                    column.type.create(db.session.connection(), checkfirst=True)
+            db.session.execute(CreateTable(table))
+        collection = dict(card_no="1", procedure="Consultation", doctor="Dr. A")
+        db.session.execute(insert(Collection.__table__), [
+            dict(collection, payment_method="CASH", amount=1500.25, date=date(2024, 1, 3)),
+            dict(collection, payment_method="CASH", amount=499.5, date=date(2024, 1, 3)),
+            dict(collection, payment_method="TILL", amount=2000, date=date(2024, 1, 3)),
+            dict(collection, payment_method="INVOICE", amount=None, date=date(2024, 1, 3)),
+            dict(collection, payment_method="MPESA", amount=750.1, date=date(2024, 1, 9)),
+            dict(collection, payment_method="CARD", amount=0.3, date=date(2024, 2, 1)),
+        ])
+        db.session.execute(insert(Expense.__table__), [
+            dict(expense_name="Gloves", payment_method="CASH", amount=120.4, date=date(2024, 1, 3)),
+            dict(expense_name="Rent", payment_method="MPESA", amount=8000, date=date(2024, 1, 5)),
+        ])
+        db.session.commit()
+
+        try:
+            upgrade(directory=MIGRATIONS)
+
+            assert db.session.scalar(select(func.count()).select_from(DailySummary)) == 4
+            assert DailySummary.verify() == []
+            assert DailyBalance.verify() == []
+            day = db.session.get(DailySummary, date(2024, 1, 3))
+            assert (day.cash_total, day.till_total, day.invoice_total) == (1999.75, 2000, 0)
+            assert (day.collections_count, day.expenses_count) == (4, 1)
+            assert DailyBalance.as_of(date(2024, 1, 31))["expenses_total"] == 8120.4
+        finally:
+            db.session.rollback()
+            db.session.execute(text("DROP TABLE IF EXISTS alembic_version"))
+            db.session.commit()
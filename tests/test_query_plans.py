@@ -0,0 +1,16 @@
+from benchmarks.check_query_plans import check
+
+
+def test_hot_queries_use_indexes(app):
+    results = check(app)
+
+    failed = [f"{target} returned {status}" for _, target, status, _ in results if status != 200]
+    assert not failed, "\n".join(failed)
+    scans = [
+        f"{label}: {' '.join(statement.split())}\n    " + "\n    ".join(plan)
+        for label, _, _, plans in results
+        for statement, plan, found in plans
+        if found
+    ]
+    assert not scans, "full table scans:\n" + "\n".join(scans)
+    assert all(plans for _, _, _, plans in results)
@@ -0,0 +1,91 @@
+import pytest
+
+import replica
+
+DAY = "2024-03-01"
+
+
+def collection(card_no):
+    return {"card_no": card_no, "procedure": "Filling", "payment_method": "CASH",
+            "amount": 100, "doctor": "Dr. A", "date": DAY}
+
+
+def build(config):
+    from app import create_app
+    from models import db
+
+    app = create_app(config)
+    with app.app_context():
+        db.create_all(bind_key=None)  # the replica is a copy of the primary
+    return app
+
+
+def dispose(app):
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    """Forget replica failures from earlier tests, and keep the replica bind
+    that init_app registers on the shared db out of later tests"""
+    from models import db
+
+    monkeypatch.setattr(replica, "_down_until", 0.0)
+    monkeypatch.setattr(db, "metadatas", dict(db.metadatas))
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Primary and replica SQLite files whose contents tell them apart"""
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica")}
+    for name, url in urls.items():
+        app = build({"SQLALCHEMY_DATABASE_URI": url})
+        assert app.test_client().post("/collections", json=collection(name)).status_code == 201
+        dispose(app)
+    return urls
+
+
+def routed_app(primary, replica_url):
+    return build({"SQLALCHEMY_DATABASE_URI": primary, "DATABASE_REPLICA_URL": replica_url})
+
+
+def card_numbers(client, **kwargs):
+    response = client.get(f"/collections/{DAY}", **kwargs)
+    assert response.status_code == 200
+    return [row["card_no"] for row in response.get_json()]
+
+
+def test_reads_go_to_replica_until_the_client_writes(databases):
+    app = routed_app(databases["primary"], databases["replica"])
+    client = app.test_client()
+    assert card_numbers(client) == ["replica"]
+
+    response = client.post("/collections", json=collection("written"))
+    assert response.status_code == 201
+    assert replica.STICKY_COOKIE in response.headers["Set-Cookie"]
+    assert card_numbers(client) == ["primary", "written"]
+    # Other clients still read the replica, which has not caught up
+    assert card_numbers(app.test_client()) == ["replica"]
+    dispose(app)
+
+
+def test_override_header_reads_primary(databases):
+    app = routed_app(databases["primary"], databases["replica"])
+    client = app.test_client()
+    assert card_numbers(client, headers={"X-Read-Primary": "1"}) == ["primary"]
+    assert card_numbers(client) == ["replica"]
+    dispose(app)
+
+
+def test_unreachable_replica_falls_back_to_primary(databases, tmp_path):
+    app = routed_app(databases["primary"], f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    client = app.test_client()
+    assert card_numbers(client) == ["primary"]
+    assert replica._down_until > 0
+    # Later reads skip the replica without retrying it
+    assert card_numbers(client) == ["primary"]
+    dispose(app)
@@ -0,0 +1,51 @@
+import json
+import time
+
+import pytest
+
+from resources import report_jobs
+
+
+@pytest.fixture(autouse=True)
+def job_manager(app, tmp_path, monkeypatch):
+    """A fresh job manager writing to a scratch directory"""
+    app.config.update(REPORT_JOB_DIR=str(tmp_path / "jobs"), REPORT_JOB_PROCESSES=1)
+    monkeypatch.setattr(report_jobs, "jobs", report_jobs.ReportJobManager())
+    yield
+    if report_jobs.jobs.processes is not None:
+        report_jobs.jobs.processes.shutdown()
+
+
+def finished(client, location):
+    for _ in range(200):
+        status = client.get(location).get_json()
+        if status["status"] not in ("queued", "running"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"{location} did not finish")
+
+
+@pytest.mark.parametrize("fmt", ["json", "xlsx"])
+def test_job_is_visible_to_other_workers(seeded_client, fmt):
+    response = seeded_client.post("/reports/jobs", json={"type": "month", "month": "2024-03", "format": fmt})
+    assert response.status_code == 202
+    status = finished(seeded_client, response.headers["Location"])
+    assert status["status"] == "done", status["error"]
+
+    # A worker that never saw the job answers from its manifest
+    report_jobs.jobs = report_jobs.ReportJobManager()
+    assert seeded_client.get(response.headers["Location"]).get_json() == status
+    artifact = seeded_client.get(status["artifact_url"])
+    assert artifact.status_code == 200
+    if fmt == "json":
+        days = json.loads(artifact.data)["days"]
+        assert [day["date"] for day in days] == [f"2024-03-{day:02d}" for day in range(1, 32)]
+    else:
+        assert artifact.data[:2] == b"PK"
+
+
+def test_job_routes_reject_other_methods(client):
+    assert client.get("/reports/jobs").status_code == 405
+    assert client.post("/reports/jobs/" + "0" * 32).status_code == 405
+    assert client.get("/reports/jobs/" + "0" * 32).status_code == 404
+    assert client.get("/reports/jobs/../jobs/artifact").status_code == 404
@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+import columnar
+
+
+@pytest.fixture
+def seeded(app):
+    from models import db
+    from benchmarks.synthetic import generate
+
+    with app.app_context():
+        db.create_all()
+        generate(start=date(2024, 1, 1), months=3, rows_per_day=30)
+        yield app
+
+
+@pytest.mark.parametrize("start, end", [
+    (None, None),
+    (date(2024, 2, 10), date(2024, 3, 20)),
+    (date(2024, 3, 31), date(2024, 3, 31)),
+])
+def test_numpy_engine_matches_sql(seeded, start, end):
+    pytest.importorskip("numpy")
+    from benchmarks.bench_tally_engine import parity
+
+    assert parity(start, end) == []
+
+
+def test_numpy_engine_without_numpy(seeded, monkeypatch):
+    from models import DailySummary
+
+    monkeypatch.setattr(columnar, "np", None)
+    with pytest.raises(RuntimeError, match="needs NumPy"):
+        DailySummary.compute_from_base(engine="numpy")
+    result = seeded.test_cli_runner().invoke(args=["rollup", "verify", "--engine", "numpy"])
+    assert result.exit_code == 1
+    assert "needs NumPy" in result.output